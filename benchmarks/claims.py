@@ -0,0 +1,79 @@
+"""
+Size and throughput of access tokens with compact claim encoding.
+
+    $ python benchmarks/claims.py [iterations]
+
+Compares the regular format with short claim aliases (JWT_COMPACT_CLAIMS), DEFLATE
+compressed payloads (JWT_COMPRESS_CLAIMS) and both, for small and large user claims.
+"""
+import datetime
+import sys
+import time
+
+from sanic_jwt_extended.tokens import encode_access_token_sync, decode_jwt_sync
+
+SECRET = 'benchmark-secret'
+ALGORITHM = 'HS256'
+
+ALIASES = {'identity': 'sub', 'user_claims': 'uc', 'scopes': 'sc', 'type': 't', 'fresh': 'f'}
+
+FORMATS = {
+    'regular': (None, None),
+    'aliases': (ALIASES, None),
+    'deflate': (None, 256),
+    'both': (ALIASES, 256),
+}
+
+USER_CLAIMS = {
+    'small': {'role': 'admin'},
+    'large': {
+        'roles': ['admin', 'editor', 'viewer', 'billing', 'support'],
+        'permissions': ['{}:{}'.format(resource, action)
+                        for resource in ('users', 'orders', 'invoices', 'reports', 'products', 'settings')
+                        for action in ('read', 'create', 'update', 'delete')],
+        'organization': {'id': 'org-4f1c2a', 'name': 'Example Corporation', 'plan': 'enterprise'},
+        'locale': 'en-US',
+        'timezone': 'Europe/Amsterdam',
+    },
+}
+
+
+def bench(user_claims: dict, claim_aliases: dict, compress_min_size: int, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        token = encode_access_token_sync(
+            identity='benchmark@example.com', secret=SECRET, algorithm=ALGORITHM,
+            expires_delta=datetime.timedelta(minutes=15), fresh=False, user_claims=user_claims,
+            identity_claim_key='identity', user_claims_key='user_claims',
+            scopes=['read', 'write'], claim_aliases=claim_aliases, compress_min_size=compress_min_size
+        )
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        data = decode_jwt_sync(token, SECRET, ALGORITHM, 'identity', 'user_claims',
+                               claim_aliases=claim_aliases, decompress=compress_min_size is not None)
+    decode_time = time.perf_counter() - start
+
+    assert data['user_claims'] == user_claims
+    return len(token), iterations / encode_time, iterations / decode_time
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    # Warm up PyJWT imports and caches
+    bench(USER_CLAIMS['small'], None, None, 100)
+
+    print('{:<7} {:<9} {:>7} {:>7} {:>14} {:>14}'.format(
+        'claims', 'format', 'bytes', 'saved', 'encode ops/s', 'decode ops/s'))
+    for claims_name, user_claims in USER_CLAIMS.items():
+        baseline = None
+        for format_name, (claim_aliases, compress_min_size) in FORMATS.items():
+            size, encode, decode = bench(user_claims, claim_aliases, compress_min_size, iterations)
+            baseline = baseline or size
+            print('{:<7} {:<9} {:>7} {:>6.0%} {:>14,.0f} {:>14,.0f}'.format(
+                claims_name, format_name, size, 1 - size / baseline, encode, decode))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Cold import time of the package and of the decorators module.
+
+    $ python benchmarks/import_time.py [--runs N] [--max-ms MS]
+
+Each measurement runs in a fresh interpreter. Exits with status 1 when the best
+run of any target is slower than --max-ms, or when importing it pulls in modules
+that should only load on first use (PyJWT, cryptography).
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+TARGETS = [
+    'sanic_jwt_extended',
+    'sanic_jwt_extended.decorators',
+]
+
+LAZY_MODULES = ['jwt', 'cryptography']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {target}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(target: str, runs: int):
+    """
+    :return: (best import time in milliseconds, lazy modules loaded by the import)
+    """
+    best = None
+    loaded = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', PROBE.format(target=target, lazy=LAZY_MODULES)])
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        best = result['ms'] if best is None else min(best, result['ms'])
+        loaded = result['loaded']
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    failed = False
+    for target in TARGETS:
+        best, loaded = measure(target, args.runs)
+        print('{:<32} {:>8.2f} ms  eager: {}'.format(target, best, ', '.join(loaded) or '-'))
+
+        if loaded or (args.max_ms is not None and best > args.max_ms):
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""
+End-to-end load test of a Sanic app protected by this extension.
+
+    $ python benchmarks/load_test.py --duration 10 --concurrency 64 \
+          --mix login=1,refresh=1,protected=8,invalid=1 --max-p99-ms 50
+
+Starts an app modeled on examples/basic.py and examples/refresh_token.py on
+localhost, drives it with a concurrent asyncio HTTP/1.1 keep-alive client, and
+prints throughput and latency percentiles per request kind. Exits with status 1
+when a request gets an unexpected status or a configured threshold is exceeded.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import sys
+import time
+
+EXPECTED_STATUS = {
+    'login': 200,
+    'refresh': 200,
+    'protected': 200,
+    'invalid': 422,
+}
+
+
+def run_app(host: str, port: int, workers: int):
+    from sanic import Sanic
+    from sanic.response import json as json_response
+
+    from sanic_jwt_extended import (
+        JWTManager, jwt_required, jwt_refresh_token_required, create_access_token, create_refresh_token
+    )
+
+    app = Sanic('load_test')
+    app.config['JWT_SECRET_KEY'] = 'super-secret'
+    JWTManager(app)
+
+    @app.route('/login', methods=['POST'])
+    async def login(request):
+        username = request.json.get('username', None)
+        password = request.json.get('password', None)
+        if username != 'test' or password != 'test':
+            return json_response({"msg": "Bad username or password"}, status=403)
+
+        access_token = await create_access_token(identity=username, app=request.app)
+        refresh_token = await create_refresh_token(identity=username, app=request.app)
+        return json_response(dict(access_token=access_token, refresh_token=refresh_token), status=200)
+
+    @app.route('/refresh', methods=['GET'])
+    @jwt_refresh_token_required
+    async def refresh(request, token):
+        access_token = await create_access_token(identity=token.jwt_identity, app=request.app)
+        return json_response(dict(access_token=access_token), status=200)
+
+    @app.route('/protected', methods=['GET'])
+    @jwt_required
+    async def protected(request, token):
+        return json_response(dict(logined_as=token.jwt_identity))
+
+    app.run(host=host, port=port, workers=workers, access_log=False, debug=False)
+
+
+class Connection:
+    """
+    Minimal HTTP/1.1 keep-alive client connection
+    """
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, headers: dict = None, body: dict = None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        lines = ['{} {} HTTP/1.1'.format(method, path), 'Host: {}:{}'.format(self.host, self.port),
+                 'Content-Length: {}'.format(len(payload))]
+        if body is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend('{}: {}'.format(name, value) for name, value in (headers or {}).items())
+
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload)
+
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        length = 0
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        response_body = await self.reader.readexactly(length)
+
+        return int(status_line.split()[1]), response_body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class LoadTest:
+    def __init__(self, host: str, port: int, mix: dict, concurrency: int, duration: float):
+        self.host = host
+        self.port = port
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.latencies = {kind: [] for kind in self.kinds}
+        self.errors = {kind: 0 for kind in self.kinds}
+        self.access_token = None
+        self.refresh_token = None
+
+    async def login(self, connection: Connection):
+        status, body = await connection.request('POST', '/login', body={'username': 'test', 'password': 'test'})
+        if status == 200:
+            tokens = json.loads(body.decode('utf-8'))
+            self.access_token = tokens['access_token']
+            self.refresh_token = tokens['refresh_token']
+        return status
+
+    async def send(self, connection: Connection, kind: str):
+        if kind == 'login':
+            return await self.login(connection)
+        if kind == 'refresh':
+            token = self.refresh_token
+            path = '/refresh'
+        elif kind == 'protected':
+            token = self.access_token
+            path = '/protected'
+        else:
+            token = self.access_token[:-4] + 'AAAA'
+            path = '/protected'
+
+        status, _ = await connection.request('GET', path, headers={'Authorization': 'Bearer ' + token})
+        return status
+
+    async def client(self, deadline: float):
+        connection = Connection(self.host, self.port)
+        try:
+            while time.perf_counter() < deadline:
+                kind = random.choices(self.kinds, self.weights)[0]
+                start = time.perf_counter()
+                status = await self.send(connection, kind)
+                self.latencies[kind].append(time.perf_counter() - start)
+                if status != EXPECTED_STATUS[kind]:
+                    self.errors[kind] += 1
+        finally:
+            connection.close()
+
+    async def run(self):
+        connection = Connection(self.host, self.port)
+        await self.login(connection)
+        connection.close()
+
+        deadline = time.perf_counter() + self.duration
+        start = time.perf_counter()
+        await asyncio.gather(*(self.client(deadline) for _ in range(self.concurrency)))
+        return time.perf_counter() - start
+
+
+def percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100.0 * (len(values) - 1))))
+    return values[index] * 1000
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(','):
+        kind, _, weight = item.partition('=')
+        if kind not in EXPECTED_STATUS:
+            raise argparse.ArgumentTypeError('Unknown request kind: {}'.format(kind))
+        mix[kind] = float(weight)
+    return mix
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('App did not start on {}:{}'.format(host, port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=1, help='Sanic worker processes')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('login=1,refresh=1,protected=8,invalid=1'))
+    parser.add_argument('--max-p50-ms', type=float, default=None)
+    parser.add_argument('--max-p99-ms', type=float, default=None)
+    parser.add_argument('--min-rps', type=float, default=None)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=run_app, args=(args.host, args.port, args.workers))
+    server.start()
+    try:
+        wait_for_port(args.host, args.port)
+        test = LoadTest(args.host, args.port, args.mix, args.concurrency, args.duration)
+        loop = asyncio.new_event_loop()
+        elapsed = loop.run_until_complete(test.run())
+    finally:
+        server.terminate()
+        server.join()
+
+    every = [latency for kind in test.kinds for latency in test.latencies[kind]]
+    total = len(every)
+    rps = total / elapsed
+    p50, p99 = percentile(every, 50), percentile(every, 99)
+
+    print('{:<10} {:>9} {:>7} {:>9} {:>9} {:>9}'.format('kind', 'requests', 'errors', 'p50 ms', 'p90 ms', 'p99 ms'))
+    for kind in test.kinds:
+        latencies = test.latencies[kind]
+        print('{:<10} {:>9} {:>7} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+            kind, len(latencies), test.errors[kind],
+            percentile(latencies, 50), percentile(latencies, 90), percentile(latencies, 99)))
+    print('{:<10} {:>9} {:>7} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+        'all', total, sum(test.errors.values()), p50, percentile(every, 90), p99))
+    print('throughput: {:,.0f} requests/s'.format(rps))
+
+    failures = []
+    if sum(test.errors.values()):
+        failures.append('{} requests got an unexpected status'.format(sum(test.errors.values())))
+    if args.max_p50_ms is not None and p50 > args.max_p50_ms:
+        failures.append('p50 {:.2f} ms > {} ms'.format(p50, args.max_p50_ms))
+    if args.max_p99_ms is not None and p99 > args.max_p99_ms:
+        failures.append('p99 {:.2f} ms > {} ms'.format(p99, args.max_p99_ms))
+    if args.min_rps is not None and rps < args.min_rps:
+        failures.append('throughput {:,.0f} requests/s < {}'.format(rps, args.min_rps))
+
+    for failure in failures:
+        print('FAIL: ' + failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
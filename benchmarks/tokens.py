@@ -0,0 +1,62 @@
+"""
+Sign and verify throughput of the supported algorithms.
+
+    $ python benchmarks/tokens.py [iterations]
+
+Asymmetric algorithms require the ``cryptography`` package.
+"""
+import datetime
+import sys
+import time
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from sanic_jwt_extended.tokens import encode_access_token_sync, decode_jwt_sync
+
+
+def generate_keys():
+    """
+    :return: Mapping of algorithm name to (encode key, decode key)
+    """
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    ec_key = ec.generate_private_key(ec.SECP256R1(), backend=default_backend())
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+
+    return {
+        'HS256': ('benchmark-secret', 'benchmark-secret'),
+        'RS256': (rsa_key, rsa_key.public_key()),
+        'ES256': (ec_key, ec_key.public_key()),
+        'EdDSA': (ed_key, ed_key.public_key()),
+    }
+
+
+def bench(algorithm: str, encode_key, decode_key, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        token = encode_access_token_sync(
+            identity='benchmark', secret=encode_key, algorithm=algorithm,
+            expires_delta=datetime.timedelta(minutes=15), fresh=False, user_claims=None,
+            identity_claim_key='identity', user_claims_key='user_claims'
+        )
+    sign_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode_jwt_sync(token, decode_key, algorithm, 'identity', 'user_claims')
+    verify_time = time.perf_counter() - start
+
+    return iterations / sign_time, iterations / verify_time, len(token)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    print('{:<8} {:>14} {:>14} {:>8}'.format('alg', 'sign ops/s', 'verify ops/s', 'bytes'))
+    for algorithm, (encode_key, decode_key) in generate_keys().items():
+        sign, verify, size = bench(algorithm, encode_key, decode_key, iterations)
+        print('{:<8} {:>14,.0f} {:>14,.0f} {:>8}'.format(algorithm, sign, verify, size))
+
+
+if __name__ == '__main__':
+    main()
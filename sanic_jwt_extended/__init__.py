@@ -1,5 +1,48 @@
-from .jwt_manager import (JWTManager)
-from .utils import (create_refresh_token, create_access_token)
-from .decorators import (jwt_required, jwt_optional, jwt_refresh_token_required, fresh_jwt_required)
+import sys
+from importlib import import_module
 
 __version__ = "0.1.0"
+
+# Public API is resolved on first access, so importing the package (or only the decorators)
+# does not load sanic, PyJWT and its crypto backends up front.
+_exports = {
+    "JWTManager": "jwt_manager",
+    "create_refresh_token": "utils",
+    "create_access_token": "utils",
+    "revoke_token": "utils",
+    "revoke_reference_token": "utils",
+    "create_gateway_headers": "utils",
+    "jwt_required": "decorators",
+    "jwt_optional": "decorators",
+    "jwt_refresh_token_required": "decorators",
+    "fresh_jwt_required": "decorators",
+    "jwt_websocket_required": "decorators",
+    "jwt_scopes_required": "decorators",
+    "jwt_rate_limit": "decorators",
+    "jwt_single_use": "decorators",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+    value = getattr(import_module("." + _exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
+
+if sys.version_info < (3, 7):
+    # Module level __getattr__ (PEP 562) is not available, import eagerly
+    from .jwt_manager import (JWTManager)
+    from .utils import (create_refresh_token, create_access_token, revoke_token,
+                        revoke_reference_token, create_gateway_headers)
+    from .decorators import (jwt_required, jwt_optional, jwt_refresh_token_required, fresh_jwt_required,
+                             jwt_websocket_required, jwt_scopes_required, jwt_rate_limit,
+                             jwt_single_use)
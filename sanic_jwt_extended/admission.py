@@ -0,0 +1,109 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+
+from sanic_jwt_extended.exceptions import ServiceOverloadedError
+
+
+class AdmissionController:
+    """
+    Limits how many callers run a section at once, with a bounded queue of waiting
+    callers. Once the queue is full new callers are shed immediately with
+    ServiceOverloadedError instead of waiting, so the latency of admitted callers
+    stays bounded under overload. Slots are handed to waiters in arrival order.
+
+    Blocking work such as signing and verifying tokens is passed to :meth:`run`, which
+    holds a slot while the call runs in a thread pool with one thread per slot. The
+    event loop keeps serving requests meanwhile, so ``in_flight`` and ``queue_depth``
+    reflect the calls actually running and waiting. Sections that only await
+    are guarded by using the controller as an async context manager::
+
+        async with controller:
+            ...
+    """
+    def __init__(self, max_concurrency: int, max_queue: int = 0):
+        """
+        :param max_concurrency: Maximum number of callers inside the section
+        :param max_queue: Maximum number of callers waiting for a slot
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.counters = {"admitted": 0, "queued": 0, "shed": 0}
+        self._waiters = deque()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="jwt-admission")
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        :return: Number of callers waiting for a slot
+        """
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """
+        Take a slot, waiting in the queue if none is free.
+        Raises ServiceOverloadedError when the queue is full.
+        """
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.counters["shed"] += 1
+            raise ServiceOverloadedError("Service overloaded, try again later")
+
+        future = asyncio.get_event_loop().create_future()
+        self._waiters.append(future)
+        self.counters["queued"] += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+
+        self.counters["admitted"] += 1
+
+    def release(self) -> None:
+        """
+        Give back a slot, handing it to the oldest waiter if any
+        """
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Call a blocking function in the thread pool of the controller once a slot is free.
+        The slot is given back when the call returns, even if the caller is cancelled
+        while waiting for it. Raises ServiceOverloadedError when the queue is full.
+
+        :param fn: Function to call
+        :return: Return value of the call
+        """
+        await self.acquire()
+        loop = asyncio.get_event_loop()
+        try:
+            future = self._executor.submit(partial(fn, *args, **kwargs))
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.release))
+        return await asyncio.wrap_future(future)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
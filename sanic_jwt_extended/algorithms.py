@@ -0,0 +1,95 @@
+from typing import Dict
+
+import jwt
+from jwt.algorithms import Algorithm, get_default_algorithms
+from jwt.exceptions import InvalidKeyError
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+    from cryptography.hazmat.primitives.serialization import (
+        load_pem_private_key, load_pem_public_key, load_ssh_public_key
+    )
+
+    has_crypto = True
+except ImportError:
+    has_crypto = False
+
+_registered = False
+
+
+class Ed25519Algorithm(Algorithm):
+    """
+    Performs signing and verification operations using EdDSA over Ed25519.
+    Requires the ``cryptography`` package.
+    """
+    def prepare_key(self, key):
+        if isinstance(key, (Ed25519PrivateKey, Ed25519PublicKey)):
+            return key
+
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        if not isinstance(key, bytes):
+            raise TypeError('Expecting a PEM-formatted or OpenSSH key.')
+
+        try:
+            if key.startswith(b'ssh-ed25519'):
+                key = load_ssh_public_key(key, backend=default_backend())
+            elif b'PRIVATE' in key:
+                key = load_pem_private_key(key, password=None, backend=default_backend())
+            else:
+                key = load_pem_public_key(key, backend=default_backend())
+        except ValueError:
+            raise InvalidKeyError('Could not parse the provided Ed25519 key.')
+
+        if not isinstance(key, (Ed25519PrivateKey, Ed25519PublicKey)):
+            raise InvalidKeyError('Expecting an Ed25519 key.')
+
+        return key
+
+    def sign(self, msg, key):
+        if not isinstance(key, Ed25519PrivateKey):
+            raise InvalidKeyError('Signing requires an Ed25519 private key.')
+        return key.sign(msg)
+
+    def verify(self, msg, key, sig):
+        if isinstance(key, Ed25519PrivateKey):
+            key = key.public_key()
+        try:
+            key.verify(sig, msg)
+            return True
+        except InvalidSignature:
+            return False
+
+
+def register_algorithms() -> None:
+    """
+    Register the algorithms PyJWT does not ship with (``EdDSA``).
+    Does nothing if ``cryptography`` is missing or PyJWT already provides them.
+    """
+    global _registered
+
+    if _registered or not has_crypto:
+        return
+    try:
+        jwt.register_algorithm('EdDSA', Ed25519Algorithm())
+    except ValueError:
+        # PyJWT already provides it
+        pass
+    _registered = True
+
+
+def get_algorithm(name: str) -> Algorithm:
+    """
+    Get the PyJWT algorithm object for an algorithm name
+
+    :param name: Algorithm name (ex: RS256, EdDSA)
+    :return: Algorithm object used to prepare keys, sign and verify
+    """
+    algorithms: Dict[str, Algorithm] = get_default_algorithms()
+    if name in algorithms:
+        return algorithms[name]
+    if name == 'EdDSA' and has_crypto:
+        return Ed25519Algorithm()
+    raise NotImplementedError('Algorithm not supported: {}'.format(name))
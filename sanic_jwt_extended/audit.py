@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+from typing import Dict, List
+
+
+class AuditSink:
+    """
+    Interface of the destinations audit events are written to. Events arrive in batches
+    from a background task, never from the request path.
+    """
+    async def write(self, events: List[Dict]) -> None:
+        """
+        :param events: Batch of audit events, in the order they were emitted
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """
+        Release resources held by the sink, called once the server stops
+        """
+        pass
+
+
+class JSONLinesFileSink(AuditSink):
+    """
+    Writes audit events to a local file, one JSON object per line. Once the file
+    would grow past max_bytes it is rotated to ``path.1``, ``path.2``... keeping
+    backup_count old files. File I/O runs in the default executor.
+    """
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        """
+        :param path: Path of the audit log file
+        :param max_bytes: Size a file can reach before it is rotated
+        :param backup_count: Number of rotated files kept
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+
+    async def write(self, events: List[Dict]) -> None:
+        data = "".join(json.dumps(event, default=str) + "\n" for event in events).encode("utf-8")
+        await asyncio.get_event_loop().run_in_executor(None, self._write, data)
+
+    async def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            self._file = open(self.path, "ab")
+
+        if self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+            self._rotate()
+
+        self._file.write(data)
+        self._file.flush()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = "{}.{}".format(self.path, index)
+            if os.path.exists(source):
+                os.replace(source, "{}.{}".format(self.path, index + 1))
+        if self.backup_count:
+            os.replace(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+
+
+class AuditLogger:
+    """
+    Feeds audit events to a sink through a bounded queue and a background writer task,
+    so recording an event never waits on I/O. When the queue is full the overflow
+    policy decides what happens:
+
+    * ``'drop'``: the new event is dropped
+    * ``'drop_oldest'``: the oldest queued event is dropped to make room
+    * ``'block'``: the caller waits for room in the queue (backpressure)
+    """
+    POLICIES = ("drop", "drop_oldest", "block")
+
+    def __init__(self, sink: AuditSink, max_queue: int = 10000, batch_size: int = 100, policy: str = "drop"):
+        """
+        :param sink: Where events are written
+        :param max_queue: Maximum number of events waiting to be written
+        :param batch_size: Maximum number of events written at once
+        :param policy: Overflow policy, one of ``'drop'``, ``'drop_oldest'`` or ``'block'``
+        """
+        if policy not in self.POLICIES:
+            raise ValueError("policy must be one of {}".format(", ".join(self.POLICIES)))
+
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.policy = policy
+        self.counters = {"emitted": 0, "dropped": 0, "written": 0, "failed": 0}
+        self._queue = None
+        self._task = None
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        :return: Number of events waiting to be written
+        """
+        return 0 if self._queue is None else self._queue.qsize()
+
+    async def emit(self, event: Dict) -> None:
+        """
+        Queue an event for writing. Only waits with the ``'block'`` policy.
+
+        :param event: JSON serializable audit event
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.ensure_future(self._run())
+
+        self.counters["emitted"] += 1
+
+        if self.policy == "block":
+            await self._queue.put(event)
+            return
+
+        if self._queue.full():
+            self.counters["dropped"] += 1
+            if self.policy == "drop":
+                return
+            self._queue.get_nowait()
+            self._queue.task_done()
+
+        self._queue.put_nowait(event)
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                await self.sink.write(batch)
+                self.counters["written"] += len(batch)
+            except Exception:
+                self.counters["failed"] += len(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def close(self) -> None:
+        """
+        Write the queued events, stop the writer task and close the sink
+        """
+        if self._queue is not None:
+            await self._queue.join()
+            self._task.cancel()
+            self._queue = None
+            self._task = None
+        await self.sink.close()
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Union
+
+_missing = object()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: while a call is running, other callers
+    for that key wait for it and get its result or exception instead of calling again.
+    Nothing is kept once the call is done.
+    """
+    def __init__(self):
+        self._pending = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """
+        :param key: Key identifying identical calls
+        :param fn: Coroutine function called without arguments
+        :return: Result of the call, shared by every concurrent caller of the key
+        """
+        while True:
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only the caller running the call was cancelled, run it again
+                if not pending.cancelled():
+                    raise
+
+        future = asyncio.get_event_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody may be waiting, mark the exception as retrieved
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+        future.set_result(value)
+        return value
+
+
+class AsyncTTLCache:
+    """
+    Bounded in-process cache whose entries expire after a time to live.
+    The least recently used entry is evicted when the cache is full, and concurrent
+    misses for the same key are coalesced into a single call of the loader.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        """
+        :param maxsize: Maximum number of entries kept
+        :param ttl: Default time to live of an entry in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._flights = SingleFlight()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        """
+        :param key: Cache key
+        :param default: Returned when the key is missing or expired
+        :return: Cached value
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value, ttl: float = None) -> None:
+        """
+        :param key: Cache key
+        :param value: Value to cache
+        :param ttl: Time to live in seconds, defaults to the ttl of the cache
+        """
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0:
+            self._entries.pop(key, None)
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Remove an entry from the cache
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove every entry from the cache
+        """
+        self._entries.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable],
+                          ttl: Union[float, Callable[[Any], float]] = None):
+        """
+        Get a cached value, or load and cache it on a miss. While a load is running,
+        other callers for the same key wait for it and get its result or exception
+        (see :class:`SingleFlight`). Exceptions are not cached.
+
+        :param key: Cache key
+        :param loader: Coroutine function called without arguments to load the value
+        :param ttl: Time to live in seconds, or a function computing it from the loaded value
+        :return: Cached or loaded value
+        """
+        value = self.get(key, _missing)
+        if value is not _missing:
+            return value
+
+        async def load():
+            value = await loader()
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+
+        return await self._flights.do(key, load)
@@ -1,73 +1,266 @@
+import time
 from datetime import datetime
 from calendar import timegm
 from functools import wraps
-from typing import Dict, List
+from typing import Dict, Optional, TYPE_CHECKING
 
-from sanic import Sanic
-from sanic.request import Request
+from sanic_jwt_extended.exceptions import (
+    WrongTokenError, NoAuthorizationError, InvalidHeaderError, FreshTokenRequired, InsufficientScopeError,
+    RevokedTokenError, JWTDecodeError, RateLimitExceededError, JWTExtendedException, TokenAlreadyUsedError
+)
+from sanic_jwt_extended.rate_limit import TokenBucketTable
+from sanic_jwt_extended.token_location import _header_lookup
+from sanic_jwt_extended.tokens import decode_jwt_sync, Token
 
-from sanic_jwt_extended.exceptions import WrongTokenError, NoAuthorizationError, InvalidHeaderError, FreshTokenRequired
-from sanic_jwt_extended.tokens import decode_jwt, Token
+if TYPE_CHECKING:
+    from sanic import Sanic
+    from sanic.request import Request
 
 
-async def get_jwt_data(app: Sanic, token: str) -> Dict:
+def get_jwt_data_sync(app: 'Sanic', token: str, secret=None) -> Dict:
     """
-    Decodes encoded JWT token by using extension setting
+    Decodes encoded JWT token by using extension setting.
+    With ``JWT_SHARED_STATE`` enabled, the signature of a token verified by any worker is
+    not verified again, and tokens revoked by any worker raise RevokedTokenError.
+    Opaque reference tokens and tenant keys are loaded by awaiting callbacks, use
+    :func:`get_jwt_data` when ``JWT_REFERENCE_TOKENS`` or a tenant key loader is enabled.
 
     :param app: A Sanic application
     :param token: Encoded JWT string to decode
+    :param secret: Key to verify the token with, defaults to the key of the application
     :return: Dictionary containing contents of the JWT
     """
+    shared_state = app.jwt.shared_state
+    secret = app.jwt._get_decode_key(app) if secret is None else secret
+    verified = shared_state is not None and shared_state.is_verified(token, secret)
 
-    jwt_data: dict = await decode_jwt(
+    jwt_data = _decode_jwt_data(app, token, secret, not verified)
+    return _check_shared_state(app, token, secret, jwt_data, verified)
+
+
+async def _verify_jwt_data(app: 'Sanic', token: str, secret=None) -> Dict:
+    """
+    Like :func:`get_jwt_data_sync`, but with verification admission control enabled the
+    signature is verified in the thread pool of the admission controller, so concurrent
+    verifications actually overlap and the ones beyond its queue are shed.
+    """
+    admission = app.jwt.verification_admission
+    shared_state = app.jwt.shared_state
+    secret = app.jwt._get_decode_key(app) if secret is None else secret
+    verified = shared_state is not None and shared_state.is_verified(token, secret)
+
+    if admission is None or verified:
+        jwt_data = _decode_jwt_data(app, token, secret, not verified)
+    else:
+        jwt_data = await admission.run(_decode_jwt_data, app, token, secret, True)
+    return _check_shared_state(app, token, secret, jwt_data, verified)
+
+
+def _decode_jwt_data(app: 'Sanic', token: str, secret, verify_signature: bool) -> Dict:
+    return decode_jwt_sync(
         encoded_token=token,
-        secret=app.config.JWT_SECRET_KEY,
+        secret=secret,
         algorithm=app.config.JWT_ALGORITHM,
         identity_claim_key=app.config.JWT_IDENTITY_CLAIM,
-        user_claims_key=app.config.JWT_USER_CLAIMS
+        user_claims_key=app.config.JWT_USER_CLAIMS,
+        verify_signature=verify_signature,
+        claim_aliases=app.jwt._claim_aliases[app],
+        decompress=app.config.JWT_COMPRESS_CLAIMS
         )
 
+
+def _check_shared_state(app: 'Sanic', token: str, secret, jwt_data: Dict, verified: bool) -> Dict:
+    """
+    Record a newly verified token in the shared state and reject revoked tokens
+    """
+    shared_state = app.jwt.shared_state
+    if shared_state is not None:
+        if not verified:
+            shared_state.mark_verified(token, jwt_data.get("exp"), secret)
+        if shared_state.is_revoked(jwt_data["jti"]):
+            raise RevokedTokenError("Token has been revoked")
+
     return jwt_data
 
 
-async def get_jwt_data_in_request_header(app: Sanic, request: Request) -> Dict:
+async def get_jwt_data(app: 'Sanic', token: str) -> Dict:
     """
-    Get JWT token data from request header with configuration. raise NoAuthorizationHeaderError
+    Decodes encoded JWT token by using extension setting, like :func:`get_jwt_data_sync`.
+    With ``JWT_REFERENCE_TOKENS`` enabled, opaque reference tokens are resolved first,
+    and with a tenant key loader the token is verified with the keys of its tenant.
+
+    :param app: A Sanic application
+    :param token: Encoded JWT string (or opaque reference token) to decode
+    :return: Dictionary containing contents of the JWT
+    """
+    if app.config.JWT_REFERENCE_TOKENS and "." not in token:
+        return await _resolve_reference_token(app, token)
+
+    if app.jwt._tenant_key_loader is not None:
+        # Verified entries of the shared state are keyed with the tenant key
+        return await _verify_jwt_data(app, token, await _get_tenant_decode_key(app, token))
+
+    return await _verify_jwt_data(app, token)
+
+
+async def _get_tenant_decode_key(app: 'Sanic', token: str):
+    """
+    Select the key to verify a token with from its tenant claim. Tokens without
+    a tenant are verified with the key of the application.
+
+    :param app: A Sanic application
+    :param token: Encoded JWT string
+    :return: Key used to verify the token
+    """
+    unverified: dict = decode_jwt_sync(
+        encoded_token=token,
+        secret=None,
+        algorithm=app.config.JWT_ALGORITHM,
+        identity_claim_key=app.config.JWT_IDENTITY_CLAIM,
+        user_claims_key=app.config.JWT_USER_CLAIMS,
+        verify_signature=False,
+        claim_aliases=app.jwt._claim_aliases[app],
+        decompress=app.config.JWT_COMPRESS_CLAIMS
+    )
+
+    tenant = unverified.get(app.config.JWT_TENANT_CLAIM)
+    if tenant is None:
+        return app.jwt._get_decode_key(app)
+    if not isinstance(tenant, str):
+        raise JWTDecodeError("Invalid tenant claim")
+    return (await app.jwt._get_tenant_keys(app, tenant))[1]
+
+
+async def _resolve_reference_token(app: 'Sanic', reference: str) -> Dict:
+    """
+    Resolves an opaque reference token to the contents of the JWT it stands for.
+    Resolved references are cached until the token expires or the cache TTL passes,
+    and concurrent resolutions of the same reference share a single store lookup.
+    Tokens revoked in the shared state are rejected even when their reference is cached.
+
+    :param app: A Sanic application
+    :param reference: Opaque reference token
+    :return: Dictionary containing contents of the JWT
+    """
+    async def load():
+        encoded_token = await app.jwt.reference_token_store.get(reference)
+        if encoded_token is None:
+            raise JWTDecodeError("Invalid or revoked reference token")
+        return await get_jwt_data(app, encoded_token)
+
+    def ttl(token_data: dict) -> float:
+        if "exp" not in token_data:
+            return app.jwt.reference_token_cache.ttl
+        return min(app.jwt.reference_token_cache.ttl, token_data["exp"] - time.time())
+
+    jwt_data = await app.jwt.reference_token_cache.get_or_load(reference, load, ttl)
+
+    # Cached entries were only checked when they were loaded
+    shared_state = app.jwt.shared_state
+    if shared_state is not None and shared_state.is_revoked(jwt_data["jti"]):
+        raise RevokedTokenError("Token has been revoked")
+
+    return jwt_data
+
+
+def get_token_in_request_header(app: 'Sanic', request: 'Request') -> str:
+    """
+    Get encoded JWT token from request header with configuration. raise NoAuthorizationHeaderError
     when no jwt header. also raise InvalidHeaderError when malformed jwt header detected.
 
     :param app: A Sanic application
     :param request: Sanic request object that contains app
-    :return: Dictionary containing contents of the JWT
+    :return: Encoded JWT string
     """
-    header_name: str = app.config.JWT_HEADER_NAME
-    header_type: str = app.config.JWT_HEADER_TYPE
+    token = _header_lookup(app.config)(request)
+    if token is None:
+        raise NoAuthorizationError("Missing {} Header".format(app.config.JWT_HEADER_NAME))
+    return token
 
-    token_header: str = request.headers.get(header_name)
 
-    if not token_header:
-        raise NoAuthorizationError("Missing {} Header".format(header_name))
+def get_token_in_request(app: 'Sanic', request: 'Request', token_type: str = "access") -> str:
+    """
+    Get encoded JWT token from the locations of ``JWT_TOKEN_LOCATION``, in order.
+    raise NoAuthorizationError when no location has a token, and InvalidHeaderError
+    when a malformed jwt header is detected.
 
-    parts: List[str] = token_header.split()
+    :param app: A Sanic application
+    :param request: Sanic request object that contains app
+    :param token_type: Type of the expected token (``'access'`` or ``'refresh'``), which
+                       selects the cookie name and json key
+    :return: Encoded JWT string
+    """
+    return app.jwt._get_token_extractor(app, token_type)(request)
 
-    if not header_type:
-        if len(parts) != 1:
-            msg = "Bad {} header. Expected value '<JWT>'".format(header_name)
-            raise InvalidHeaderError(msg)
-        token: str = parts[0]
-    else:
-        if parts[0] != header_type or len(parts) != 2:
-            msg = "Bad {} header. Expected value '{} <JWT>'".format(
-                header_name,
-                header_type
-            )
-            raise InvalidHeaderError(msg)
-        token: str = parts[1]
 
-    data: Dict = await get_jwt_data(app, token)
-    return data
+def get_attested_jwt_data(app: 'Sanic', request: 'Request') -> Optional[Dict]:
+    """
+    Get JWT token data forwarded by a trusted gateway, when ``JWT_GATEWAY_ATTESTATION_KEY``
+    is set. The signature of the token is not verified again, the attestation of the
+    gateway is checked instead.
 
+    :param app: A Sanic application
+    :param request: Sanic request object that contains app
+    :return: Dictionary containing contents of the JWT, or None if the request has no
+             valid attestation and the token must be verified
+    """
+    config = app.config
+    key = config.JWT_GATEWAY_ATTESTATION_KEY
+    if key is None:
+        return None
 
-async def verify_jwt_data_type(token_data: dict, token_type: str) -> None:
+    from sanic_jwt_extended.gateway import verify_attestation
+
+    headers = request.headers
+    encoded_claims = headers.get(config.JWT_GATEWAY_CLAIMS_HEADER)
+    attestation = headers.get(config.JWT_GATEWAY_ATTESTATION_HEADER)
+    request_id = headers.get(config.JWT_GATEWAY_REQUEST_ID_HEADER)
+    if not encoded_claims or not attestation or not request_id:
+        return None
+
+    jwt_data = verify_attestation(key, encoded_claims, attestation, request_id, config.JWT_GATEWAY_ATTESTATION_TTL)
+    if jwt_data is None:
+        return None
+
+    shared_state = app.jwt.shared_state
+    if shared_state is not None and shared_state.is_revoked(jwt_data["jti"]):
+        raise RevokedTokenError("Token has been revoked")
+
+    return jwt_data
+
+
+def _verifies_synchronously(app: 'Sanic') -> bool:
+    """
+    :return: True if tokens can be verified without awaiting anything (no reference
+             tokens, tenant key loader or verification admission control)
+    """
+    jwt_manager = app.jwt
+    return (not app.config.JWT_REFERENCE_TOKENS and jwt_manager._tenant_key_loader is None
+            and jwt_manager.verification_admission is None)
+
+
+async def _get_jwt_data_admitted(app: 'Sanic', token: str) -> Dict:
+    """
+    :func:`get_jwt_data`, under verification admission control if enabled.
+    Concurrent verifications of the same token are coalesced into the first one,
+    so waiting requests neither verify again nor take an admission slot.
+    """
+    return await app.jwt.verification_flights.do(token, lambda: get_jwt_data(app, token))
+
+
+async def get_jwt_data_in_request_header(app: 'Sanic', request: 'Request') -> Dict:
+    """
+    Get JWT token data from request header with configuration. raise NoAuthorizationHeaderError
+    when no jwt header. also raise InvalidHeaderError when malformed jwt header detected.
+
+    :param app: A Sanic application
+    :param request: Sanic request object that contains app
+    :return: Dictionary containing contents of the JWT
+    """
+    return await _get_jwt_data_admitted(app, get_token_in_request_header(app, request))
+
+
+def verify_jwt_data_type_sync(token_data: dict, token_type: str) -> None:
     """
     Check jwt type with given argument. raise WrongTokenError if token type is not expected type,
 
@@ -78,6 +271,91 @@ async def verify_jwt_data_type(token_data: dict, token_type: str) -> None:
         raise WrongTokenError('Only {} tokens are allowed'.format(token_type))
 
 
+async def verify_jwt_data_type(token_data: dict, token_type: str) -> None:
+    """
+    Coroutine version of :func:`verify_jwt_data_type_sync`.
+    """
+    verify_jwt_data_type_sync(token_data, token_type)
+
+
+def _get_request_jwt_data(app: 'Sanic', request: 'Request', token_type: str = "access"):
+    """
+    Get the verified contents of the token of a request: the claims forwarded by a
+    trusted gateway if any, otherwise the token found in ``JWT_TOKEN_LOCATION``.
+    raise NoAuthorizationError when the request has no token, and WrongTokenError
+    when the token is not of the expected type.
+    Tokens that can be verified synchronously (see :func:`_verifies_synchronously`)
+    are verified without creating a coroutine, otherwise an awaitable is returned.
+
+    :param app: A Sanic application
+    :param request: Sanic request object that contains app
+    :param token_type: Type of the expected token (``'access'`` or ``'refresh'``)
+    :return: Dictionary containing contents of the JWT, or an awaitable resolving to it
+    """
+    jwt_data = get_attested_jwt_data(app, request)
+    if jwt_data is None:
+        encoded_token = get_token_in_request(app, request, token_type)
+        if not _verifies_synchronously(app):
+            return _get_jwt_data_of_type(app, encoded_token, token_type)
+        jwt_data = get_jwt_data_sync(app, encoded_token)
+    verify_jwt_data_type_sync(jwt_data, token_type)
+    return jwt_data
+
+
+async def _get_jwt_data_of_type(app: 'Sanic', encoded_token: str, token_type: str) -> Dict:
+    jwt_data = await _get_jwt_data_admitted(app, encoded_token)
+    verify_jwt_data_type_sync(jwt_data, token_type)
+    return jwt_data
+
+
+async def _create_token(app: 'Sanic', token_data: dict) -> Token:
+    """
+    Create the Token object passed to the endpoint. If a user loader is registered,
+    the user of the token identity is loaded into :py:attr:`~sanic_jwt_extended.tokens.Token.current_user`.
+
+    :param app: A Sanic application
+    :param token_data: Dictionary containing contents of the JWT (empty if there is no token)
+    :return: Token object
+    """
+    token = Token(app, token_data)
+    if app.jwt._user_loader is not None and token_data:
+        token.current_user = await app.jwt._load_user(token.jwt_identity)
+    return token
+
+
+def _reissue_access_token(app: 'Sanic', token: dict):
+    """
+    Start minting a replacement for an access token that is about to expire.
+    A token is re-issued at most once per worker: it is remembered once its
+    replacement has been minted, so a failed attempt is retried by the next request.
+
+    :param app: A Sanic application
+    :param token: Dictionary containing contents of the JWT
+    :return: Task resolving to the new encoded access token, or None if no re-issue is needed
+    """
+    exp = token.get("exp")
+    if exp is None or exp - time.time() > app.config.JWT_SLIDING_SESSION_WINDOW.total_seconds():
+        return None
+    jti = token["jti"]
+    if app.jwt._was_reissued(jti):
+        return None
+
+    async def reissue():
+        access_token = await app.jwt._create_access_token(
+            app,
+            identity=token[app.config.JWT_IDENTITY_CLAIM],
+            user_claims=token[app.config.JWT_USER_CLAIMS],
+            fresh=False,
+            scopes=token.get(app.config.JWT_SCOPES_CLAIM),
+            tenant=token.get(app.config.JWT_TENANT_CLAIM) if app.jwt._tenant_key_loader else None
+        )
+        app.jwt._mark_reissued(jti, exp)
+        return access_token
+
+    import asyncio
+    return asyncio.ensure_future(reissue())
+
+
 def jwt_required(fn):
     """
     A decorator to protect a Sanic endpoint.
@@ -85,17 +363,40 @@ def jwt_required(fn):
     has a valid access token before allowing the endpoint to be called.
     and if token check passed this will insert Token object to kwargs,
     This does not check the freshness of the access token.
+    If ``JWT_SLIDING_SESSION`` is enabled, an access token close to expiring is
+    replaced by a new one sent back in the ``JWT_SLIDING_SESSION_HEADER_NAME`` header.
     See also: :func:`~sanic_jwt_extended.fresh_jwt_required`
     """
     @wraps(fn)
     async def wrapper(*args, **kwargs):
         request = args[0]
         app = request.app
-        token = await get_jwt_data_in_request_header(app, request)
-        await verify_jwt_data_type(token, "access")
-        kwargs["token"] = Token(app, token)
+        token = _get_request_jwt_data(app, request)
+        if not isinstance(token, dict):
+            token = await token
+        kwargs["token"] = await _create_token(app, token) if app.jwt._user_loader else Token(app, token)
 
-        return await fn(*args, **kwargs)
+        if not app.config.JWT_SLIDING_SESSION:
+            return await fn(*args, **kwargs)
+
+        # The new token is encoded while the handler is waiting on I/O
+        reissue = _reissue_access_token(app, token)
+        if reissue is None:
+            return await fn(*args, **kwargs)
+
+        try:
+            response = await fn(*args, **kwargs)
+        except BaseException:
+            reissue.cancel()
+            raise
+
+        # The handler already ran, so a failed re-issue only leaves the header out
+        try:
+            response.headers[app.config.JWT_SLIDING_SESSION_HEADER_NAME] = await reissue
+        except Exception:
+            from sanic.log import error_logger
+            error_logger.exception("Could not re-issue the access token of a sliding session")
+        return response
     return wrapper
 
 
@@ -110,17 +411,17 @@ def jwt_optional(fn):
     """
     @wraps(fn)
     async def wrapper(*args, **kwargs):
-        token = {}
         request = args[0]
         app = request.app
 
         try:
-            token = await get_jwt_data_in_request_header(app, request)
-            await verify_jwt_data_type(token, "access")
+            token = _get_request_jwt_data(app, request)
+            if not isinstance(token, dict):
+                token = await token
         except (NoAuthorizationError, InvalidHeaderError):
-            pass
+            token = {}
 
-        kwargs["token"] = Token(app, token)
+        kwargs["token"] = await _create_token(app, token) if app.jwt._user_loader else Token(app, token)
         return await fn(*args, **kwargs)
     return wrapper
 
@@ -138,8 +439,9 @@ def fresh_jwt_required(fn):
         request = args[0]
         app = request.app
 
-        token = await get_jwt_data_in_request_header(app, request)
-        await verify_jwt_data_type(token, "access")
+        token = _get_request_jwt_data(app, request)
+        if not isinstance(token, dict):
+            token = await token
         fresh = token["fresh"]
 
         if isinstance(fresh, bool):
@@ -150,7 +452,7 @@ def fresh_jwt_required(fn):
             if fresh < now:
                 raise FreshTokenRequired('Fresh token required')
 
-        kwargs["token"] = Token(app, token)
+        kwargs["token"] = await _create_token(app, token) if app.jwt._user_loader else Token(app, token)
 
         return await fn(*args, **kwargs)
     return wrapper
@@ -167,10 +469,181 @@ def jwt_refresh_token_required(fn):
         request = args[0]
         app = request.app
 
-        token = await get_jwt_data_in_request_header(app, request)
-        await verify_jwt_data_type(token, "refresh")
+        token = _get_request_jwt_data(app, request, "refresh")
+        if not isinstance(token, dict):
+            token = await token
+
+        kwargs["token"] = await _create_token(app, token) if app.jwt._user_loader else Token(app, token)
+
+        return await fn(*args, **kwargs)
+    return wrapper
+
+
+def jwt_websocket_required(fn):
+    """
+    A decorator to protect a Sanic websocket endpoint.
+    The access token is verified once when the connection is opened, and the
+    connection is closed by the shared timer wheel of the extension when the token
+    expires, so open sockets never decode the token again per message.
+    With ``JWT_SHARED_STATE`` enabled the timer wheel also checks every
+    ``JWT_WEBSOCKET_REVOCATION_CHECK_INTERVAL`` seconds if the token has been revoked
+    by :func:`~sanic_jwt_extended.revoke_token` in any worker, and closes the
+    connection if so. A connection without a valid token is closed with
+    ``JWT_WEBSOCKET_CLOSE_CODE`` and the error as reason, without calling the handler.
+    The handler must have the ``(request, ws)`` signature of sanic websocket routes.
+    """
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        request = args[0]
+        ws = args[1]
+        app = request.app
+
+        from jwt import ExpiredSignatureError, InvalidTokenError
+
+        # Error handlers cannot answer a websocket, the connection is closed instead
+        try:
+            token = _get_request_jwt_data(app, request)
+            if not isinstance(token, dict):
+                token = await token
+            kwargs["token"] = await _create_token(app, token) if app.jwt._user_loader else Token(app, token)
+        except (JWTExtendedException, InvalidTokenError) as e:
+            reason = "Token has expired" if isinstance(e, ExpiredSignatureError) else str(e)
+            # Close frames carry at most 123 bytes of reason
+            reason = reason.encode("utf-8")[:123].decode("utf-8", "ignore")
+            await ws.close(code=app.config.JWT_WEBSOCKET_CLOSE_CODE, reason=reason)
+            return None
+
+        shared_state = app.jwt.shared_state
+        check_interval = app.config.JWT_WEBSOCKET_REVOCATION_CHECK_INTERVAL
+        checks_revocation = shared_state is not None and check_interval is not None
+        if "exp" not in token and not checks_revocation:
+            return await fn(*args, **kwargs)
+
+        timer_wheel = app.jwt.timer_wheel
+        handles = {}
+
+        def close(reason):
+            import asyncio
+            asyncio.ensure_future(ws.close(code=app.config.JWT_WEBSOCKET_CLOSE_CODE, reason=reason))
+
+        def check_revoked():
+            if shared_state.is_revoked(token["jti"]):
+                close("Token has been revoked")
+            else:
+                handles["revoked"] = timer_wheel.schedule(check_interval, check_revoked)
+
+        if "exp" in token:
+            handles["exp"] = timer_wheel.schedule(token["exp"] - time.time(), lambda: close("Token has expired"))
+        if checks_revocation:
+            handles["revoked"] = timer_wheel.schedule(check_interval, check_revoked)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            for handle in handles.values():
+                timer_wheel.cancel(handle)
+    return wrapper
+
+
+def jwt_scopes_required(*scopes: str):
+    """
+    A decorator to require scopes granted with
+    :func:`~sanic_jwt_extended.create_access_token` on a Sanic endpoint.
+    It must be placed below :func:`~sanic_jwt_extended.jwt_required` or
+    :func:`~sanic_jwt_extended.fresh_jwt_required`, which provide the token.
+    If the token stores its scopes as a bitmask (``JWT_COMPACT_SCOPES``) the check
+    is a single integer AND against the required scopes compiled once.
+    Once ``JWT_SCOPES`` is set, requiring a scope it does not list raises a ValueError
+    whatever the format of the token, as it is a configuration error.
+
+    :param scopes: Scope names that all have to be granted to the token
+    """
+    required = frozenset(scopes)
+
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            token: Token = kwargs["token"]
+            app = token.app
+            granted = token.data.get(app.config.JWT_SCOPES_CLAIM, ())
+
+            # Compiling the mask validates the required scopes against JWT_SCOPES, so a
+            # scope missing from it fails the same way for list and bitmask tokens
+            if isinstance(granted, int) or app.config.JWT_SCOPES:
+                mask = app.jwt._scope_mask(app, required)
+
+            if isinstance(granted, int):
+                allowed = granted & mask == mask
+            else:
+                allowed = required.issubset(granted)
+
+            if not allowed:
+                raise InsufficientScopeError("Missing required scopes: {}".format(", ".join(sorted(required))))
+
+            return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def jwt_rate_limit(rate: float, burst: float = None, per: str = "identity", max_entries: int = 10000):
+    """
+    A decorator to limit how often each identity (or each token) can call a Sanic endpoint.
+    It must be placed below one of the decorators that provide the token, such as
+    :func:`~sanic_jwt_extended.jwt_required`, so requests are counted before the handler runs.
+    Requests over the limit get a 429 response with a ``Retry-After`` header.
+
+    :param rate: Requests per second allowed on average
+    :param burst: Requests allowed at once, defaults to one second worth of requests
+    :param per: ``'identity'`` to limit each identity, or ``'jti'`` to limit each token
+    :param max_entries: Maximum number of identities (or tokens) tracked by this endpoint
+    """
+    if per not in ("identity", "jti"):
+        raise ValueError("per must be 'identity' or 'jti'")
+
+    buckets = TokenBucketTable(rate, burst or max(1.0, rate), max_entries)
+
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            token: Token = kwargs["token"]
+            key = token.jwt_identity if per == "identity" else token.jti
+            if isinstance(key, (dict, list)):
+                key = repr(key)
+
+            retry_after = buckets.consume(key)
+            if retry_after:
+                raise RateLimitExceededError("Rate limit exceeded", retry_after)
+
+            return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def jwt_single_use(fn):
+    """
+    A decorator to make the tokens accepted by a Sanic endpoint usable only once,
+    for flows such as password reset or step-up authentication.
+    It must be placed below one of the decorators that provide the token, such as
+    :func:`~sanic_jwt_extended.jwt_required`. The token must have an expiry, its jti
+    is remembered until then. With ``JWT_SHARED_STATE`` enabled, a token used in one
+    worker is rejected by all of them. Tokens used again get a 422 response from
+    :class:`~sanic_jwt_extended.exceptions.TokenAlreadyUsedError`.
+    """
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        token: Token = kwargs["token"]
+        jwt_manager = token.app.jwt
+        expires = token.data.get("exp")
+
+        if expires is None:
+            raise JWTDecodeError("Missing claim: exp")
+
+        if jwt_manager.shared_state is not None:
+            first_use = jwt_manager.shared_state.consume(token.jti, expires)
+        else:
+            first_use = jwt_manager.consumed_jtis.consume(token.jti, expires)
 
-        kwargs["token"] = Token(app, token)
+        if not first_use:
+            raise TokenAlreadyUsedError("Token has already been used")
 
         return await fn(*args, **kwargs)
     return wrapper
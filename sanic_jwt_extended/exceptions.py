@@ -41,9 +41,51 @@ class RevokedTokenError(JWTExtendedException):
     pass
 
 
+class TokenAlreadyUsedError(RevokedTokenError):
+    """
+    Error raised when a token that was already used attempts to access an endpoint
+    protected by jwt_single_use
+    """
+    pass
+
+
 class FreshTokenRequired(JWTExtendedException):
     """
     Error raised when a valid, non-fresh JWT attempt to access an endpoint
     protected by fresh_jwt_required
     """
     pass
+
+
+class InsufficientScopeError(JWTExtendedException):
+    """
+    Error raised when a valid JWT without the required scopes attempt to access
+    an endpoint protected by jwt_scopes_required
+    """
+    pass
+
+
+class UserLoadError(JWTExtendedException):
+    """
+    Error raised when the user loader callback returns None for the
+    identity of a valid JWT
+    """
+    pass
+
+
+class RateLimitExceededError(JWTExtendedException):
+    """
+    Error raised when an identity or token exceeds the request rate allowed
+    by jwt_rate_limit
+    """
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ServiceOverloadedError(JWTExtendedException):
+    """
+    Error raised when token signing or verification is shed by admission
+    control because too many calls are already waiting
+    """
+    pass
@@ -0,0 +1,76 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Dict, Optional, Tuple, Union
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _mac(key: bytes, issued_at: int, request_id: str, encoded_claims: str) -> str:
+    message = '{}.{}.{}'.format(issued_at, request_id, encoded_claims).encode('utf-8')
+    return _b64encode(hmac.new(key, message, hashlib.sha256).digest())
+
+
+def _key_bytes(key: Union[str, bytes]) -> bytes:
+    return key.encode('utf-8') if isinstance(key, str) else key
+
+
+def attest_claims(key: Union[str, bytes], claims: Dict, request_id: str, now: float = None) -> Tuple[str, str]:
+    """
+    Sign verified claims so a service trusting the same key can use them without
+    verifying the token again. The attestation is bound to a request ID and to the
+    time it was made.
+
+    :param key: Attestation key shared by the gateway and the internal services
+    :param claims: Claims of a verified token
+    :param request_id: ID of the request the claims are forwarded with
+    :param now: Current unix time, defaults to the system clock
+    :return: Encoded claims and attestation
+    """
+    issued_at = int(time.time() if now is None else now)
+    encoded_claims = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return encoded_claims, '{}.{}'.format(issued_at, _mac(_key_bytes(key), issued_at, request_id, encoded_claims))
+
+
+def verify_attestation(key: Union[str, bytes], encoded_claims: str, attestation: str, request_id: str,
+                       ttl: float, now: float = None) -> Optional[Dict]:
+    """
+    Check claims attested by :func:`attest_claims`.
+
+    :param key: Attestation key shared by the gateway and the internal services
+    :param encoded_claims: Encoded claims
+    :param attestation: Attestation of the claims
+    :param request_id: ID of the request the claims came with
+    :param ttl: How many seconds an attestation is accepted for
+    :param now: Current unix time, defaults to the system clock
+    :return: The claims, or None if the attestation is invalid, expired or made for another request
+    """
+    issued_at, _, mac = attestation.partition('.')
+    try:
+        issued_at = int(issued_at)
+    except ValueError:
+        return None
+
+    now = time.time() if now is None else now
+    if abs(now - issued_at) > ttl:
+        return None
+
+    try:
+        if not hmac.compare_digest(_mac(_key_bytes(key), issued_at, request_id, encoded_claims), mac):
+            return None
+    except TypeError:
+        # Non ascii attestation
+        return None
+
+    claims = json.loads(_b64decode(encoded_claims).decode('utf-8'))
+    if not isinstance(claims, dict) or claims.get('exp', now) < now:
+        return None
+    return claims
@@ -1,17 +1,30 @@
+import copy
 import datetime
-from json import JSONEncoder
+import math
+import secrets
+import time
+from collections import OrderedDict
+from json import JSONEncoder, dumps
 
 from sanic import Sanic
-from sanic.response import json
-
-from jwt import ExpiredSignatureError, InvalidTokenError
+from sanic.response import json, HTTPResponse
 
+from sanic_jwt_extended.admission import AdmissionController
+from sanic_jwt_extended.audit import AuditLogger
+from sanic_jwt_extended.cache import AsyncTTLCache, SingleFlight
 from sanic_jwt_extended.exceptions import (
     JWTDecodeError, NoAuthorizationError, InvalidHeaderError, WrongTokenError,
-    RevokedTokenError, FreshTokenRequired
+    RevokedTokenError, FreshTokenRequired, InsufficientScopeError, RateLimitExceededError, UserLoadError,
+    ServiceOverloadedError, TokenAlreadyUsedError
 )
+from sanic_jwt_extended.reference_tokens import InMemoryReferenceTokenStore
+from sanic_jwt_extended.scopes import compile_scopes
+from sanic_jwt_extended.shared_state import SharedTokenState, default_state_path
+from sanic_jwt_extended.single_use import ConsumedJtiSet
+from sanic_jwt_extended.timer_wheel import TimerWheel
+from sanic_jwt_extended.token_location import compile_token_extractor
 from sanic_jwt_extended.tokens import (
-    encode_refresh_token, encode_access_token
+    encode_refresh_token_sync, encode_access_token_sync, peek_claims
 )
 
 
@@ -22,6 +35,10 @@ class JWTManager:
     Instances of :class:`JWTManger` are *not* bound to specific apps, so
     you can create one in the main body of your code and then bind it
     to your app in a factory function.
+
+    The same instance can be bound to several apps. Each of them then gets its own
+    caches, shared state, admission controllers and audit logger in ``app.jwt``,
+    while the callbacks registered on this instance are used by all of them.
     """
     def __init__(self, app: Sanic):
         """
@@ -30,6 +47,15 @@ class JWTManager:
         this object (in a factory pattern).
         :param app: A sanic application
         """
+        self._prepared_keys = {}
+        # Compiled per application, as the extension can be bound to several of them
+        self._claim_aliases = {}
+        self._scope_masks = {}
+        self._token_extractors = {}
+        # Shared with the managers of the other apps this instance is bound to
+        self._callbacks = {'tenant_key_loader': None, 'user_loader': None, 'user_claims_loader': None}
+        self._app = None
+
         if app is not None:
             self.init_app(app=app)
 
@@ -40,20 +66,78 @@ class JWTManager:
         """
         self._set_error_handlers(app=app)
         self._set_default_configuration_options(app=app)
-        app.jwt = self
+        self._claim_aliases[app] = self._compile_claim_aliases(app=app)
+
+        # The state below belongs to a single app, so apps bound after the first
+        # one get a copy of this manager holding their own
+        jwt_manager = self if self._app is None or self._app is app else copy.copy(self)
+        jwt_manager._app = app
+        jwt_manager._init_app_state(app=app)
+        app.jwt = jwt_manager
+
+    def _init_app_state(self, app: Sanic):
+        """
+        Create the caches, shared state, admission controllers and audit logger of an app
+        """
+        self._reissued = OrderedDict()
+        self.timer_wheel = TimerWheel(tick=app.config.JWT_WEBSOCKET_TIMER_TICK)
+        self.shared_state = self._create_shared_state(app=app)
+        self.consumed_jtis = ConsumedJtiSet(bucket_seconds=app.config.JWT_SINGLE_USE_BUCKET_SECONDS)
+        self.tenant_key_cache = AsyncTTLCache(
+            maxsize=app.config.JWT_TENANT_KEY_CACHE_SIZE,
+            ttl=app.config.JWT_TENANT_KEY_CACHE_TTL
+        )
+        # Kept apart so tokens with made up tenants cannot evict the keys of real ones
+        self.unknown_tenant_cache = AsyncTTLCache(
+            maxsize=app.config.JWT_TENANT_KEY_CACHE_SIZE,
+            ttl=app.config.JWT_UNKNOWN_TENANT_CACHE_TTL
+        )
+        self.reference_token_store = app.config.JWT_REFERENCE_TOKEN_STORE or InMemoryReferenceTokenStore()
+        self.reference_token_cache = AsyncTTLCache(
+            maxsize=app.config.JWT_REFERENCE_TOKEN_CACHE_SIZE,
+            ttl=app.config.JWT_REFERENCE_TOKEN_CACHE_TTL
+        )
+        self.user_cache = AsyncTTLCache(
+            maxsize=app.config.JWT_USER_CACHE_SIZE,
+            ttl=app.config.JWT_USER_CACHE_TTL
+        )
+        self.user_claims_cache = AsyncTTLCache(
+            maxsize=app.config.JWT_USER_CLAIMS_CACHE_SIZE,
+            ttl=app.config.JWT_USER_CLAIMS_CACHE_TTL
+        )
+        self.signing_admission = self._create_admission_controller(
+            app.config.JWT_SIGNING_CONCURRENCY, app.config.JWT_SIGNING_QUEUE_SIZE
+        )
+        self.verification_admission = self._create_admission_controller(
+            app.config.JWT_VERIFICATION_CONCURRENCY, app.config.JWT_VERIFICATION_QUEUE_SIZE
+        )
+        self.verification_flights = SingleFlight()
+        self.audit = self._create_audit_logger(app=app)
 
     @staticmethod
     def _set_default_configuration_options(app):
         """
         Sets the default configuration options used by this extension
         """
-        # Where to look for the JWT. Available options are cookies or headers
+        # Where to look for the JWT, in order. Available options are headers, cookies,
+        # query_string and json
         app.config.setdefault('JWT_TOKEN_LOCATION', ['headers'])
 
         # Options for JWTs when the TOKEN_LOCATION is headers
         app.config.setdefault('JWT_HEADER_NAME', 'Authorization')
         app.config.setdefault('JWT_HEADER_TYPE', 'Bearer')
 
+        # Options for JWTs when the TOKEN_LOCATION is cookies
+        app.config.setdefault('JWT_ACCESS_COOKIE_NAME', 'access_token_cookie')
+        app.config.setdefault('JWT_REFRESH_COOKIE_NAME', 'refresh_token_cookie')
+
+        # Options for JWTs when the TOKEN_LOCATION is query_string
+        app.config.setdefault('JWT_QUERY_STRING_NAME', 'jwt')
+
+        # Options for JWTs when the TOKEN_LOCATION is json
+        app.config.setdefault('JWT_JSON_KEY', 'access_token')
+        app.config.setdefault('JWT_REFRESH_JSON_KEY', 'refresh_token')
+
         # How long an a token will live before they expire.
         app.config.setdefault('JWT_ACCESS_TOKEN_EXPIRES', datetime.timedelta(minutes=15))
         app.config.setdefault('JWT_REFRESH_TOKEN_EXPIRES', datetime.timedelta(days=30))
@@ -67,93 +151,581 @@ class JWTManager:
         # if this is not set.
         app.config.setdefault('JWT_SECRET_KEY', None)
 
+        # The public and private keys needed for asymmetric based signing algorithms,
+        # such as RS*, ES* or EdDSA. These can be PEM encoded strings or already loaded
+        # key objects.
+        app.config.setdefault('JWT_PUBLIC_KEY', None)
+        app.config.setdefault('JWT_PRIVATE_KEY', None)
+
         app.config.setdefault('JWT_IDENTITY_CLAIM', 'identity')
         app.config.setdefault('JWT_USER_CLAIMS', 'user_claims')
 
         app.config.setdefault('JWT_CLAIMS_IN_REFRESH_TOKEN', False)
 
+        # Ordered list of every scope access tokens can be granted. The position of a
+        # scope is its bit when scopes are stored in tokens as a compact bitmask.
+        app.config.setdefault('JWT_SCOPES', [])
+        app.config.setdefault('JWT_SCOPES_CLAIM', 'scopes')
+        app.config.setdefault('JWT_COMPACT_SCOPES', False)
+
+        # Compact tokens. JWT_COMPACT_CLAIMS stores claims under short aliases, given by
+        # JWT_CLAIM_ALIASES or built-in ones if that is None. JWT_COMPRESS_CLAIMS DEFLATE
+        # compresses payloads of at least JWT_COMPRESS_MIN_SIZE bytes.
+        app.config.setdefault('JWT_COMPACT_CLAIMS', False)
+        app.config.setdefault('JWT_CLAIM_ALIASES', None)
+        app.config.setdefault('JWT_COMPRESS_CLAIMS', False)
+        app.config.setdefault('JWT_COMPRESS_MIN_SIZE', 256)
+
         app.config.setdefault('JWT_ERROR_MESSAGE_KEY', 'msg')
 
+        # Sliding sessions. When enabled, jwt_required endpoints send a new access
+        # token in the given response header once the current one is within the
+        # window of expiring.
+        app.config.setdefault('JWT_SLIDING_SESSION', False)
+        app.config.setdefault('JWT_SLIDING_SESSION_WINDOW', datetime.timedelta(minutes=5))
+        app.config.setdefault('JWT_SLIDING_SESSION_HEADER_NAME', 'X-Access-Token')
+
+        # Per tenant keys, loaded through the tenant_key_loader callback. The tenant of
+        # a token is stored in this claim, and loaded keys are kept in a bounded cache.
+        app.config.setdefault('JWT_TENANT_CLAIM', 'iss')
+        app.config.setdefault('JWT_TENANT_KEY_CACHE_SIZE', 1024)
+        app.config.setdefault('JWT_TENANT_KEY_CACHE_TTL', 300)
+        app.config.setdefault('JWT_UNKNOWN_TENANT_CACHE_TTL', 10)
+
+        # State shared by all workers: verified tokens and revoked jtis. The path
+        # defaults to a file named after the main process and the app, which forked
+        # workers inherit. Set it explicitly if workers are spawned instead.
+        app.config.setdefault('JWT_SHARED_STATE', False)
+        app.config.setdefault('JWT_SHARED_STATE_PATH', None)
+        app.config.setdefault('JWT_SHARED_STATE_SLOTS', 65536)
+
+        # Caches of the user_loader and user_claims_loader callbacks, keyed by identity
+        app.config.setdefault('JWT_USER_CACHE_SIZE', 10000)
+        app.config.setdefault('JWT_USER_CACHE_TTL', 60)
+        app.config.setdefault('JWT_USER_CLAIMS_CACHE_SIZE', 10000)
+        app.config.setdefault('JWT_USER_CLAIMS_CACHE_TTL', 60)
+
+        # Opaque reference tokens. When enabled, create_access_token returns a random
+        # reference to the access token kept in the store, and the decorators resolve
+        # references through an in-process cache. A reference revoked in the store is
+        # still accepted by other workers until their cached entry expires.
+        app.config.setdefault('JWT_REFERENCE_TOKENS', False)
+        app.config.setdefault('JWT_REFERENCE_TOKEN_STORE', None)
+        app.config.setdefault('JWT_REFERENCE_TOKEN_CACHE_SIZE', 10000)
+        app.config.setdefault('JWT_REFERENCE_TOKEN_CACHE_TTL', 30)
+
+        # Width in seconds of the expiry buckets jtis consumed by jwt_single_use endpoints
+        # are kept in. Not used with JWT_SHARED_STATE, which tracks them for all workers.
+        app.config.setdefault('JWT_SINGLE_USE_BUCKET_SECONDS', 60)
+
+        # Audit log of issued tokens and rejected requests. Set JWT_AUDIT_SINK to an
+        # AuditSink (such as JSONLinesFileSink) to enable it. Events are queued and
+        # written in batches by a background task.
+        app.config.setdefault('JWT_AUDIT_SINK', None)
+        app.config.setdefault('JWT_AUDIT_QUEUE_SIZE', 10000)
+        app.config.setdefault('JWT_AUDIT_BATCH_SIZE', 100)
+        app.config.setdefault('JWT_AUDIT_OVERFLOW_POLICY', 'drop')
+
+        # Admission control of token signing (create_access_token, create_refresh_token)
+        # and verification (the decorators). Signatures are computed in a thread pool of
+        # *_CONCURRENCY threads, *_QUEUE_SIZE calls wait for a thread and others are
+        # rejected with a 503. None disables it.
+        app.config.setdefault('JWT_SIGNING_CONCURRENCY', None)
+        app.config.setdefault('JWT_SIGNING_QUEUE_SIZE', 0)
+        app.config.setdefault('JWT_VERIFICATION_CONCURRENCY', None)
+        app.config.setdefault('JWT_VERIFICATION_QUEUE_SIZE', 0)
+
+        # Trusted gateway. Services sharing JWT_GATEWAY_ATTESTATION_KEY accept claims
+        # forwarded with create_gateway_headers instead of verifying the token again.
+        # Requests without a valid attestation are verified as usual.
+        app.config.setdefault('JWT_GATEWAY_ATTESTATION_KEY', None)
+        app.config.setdefault('JWT_GATEWAY_ATTESTATION_TTL', 5)
+        app.config.setdefault('JWT_GATEWAY_CLAIMS_HEADER', 'X-JWT-Claims')
+        app.config.setdefault('JWT_GATEWAY_ATTESTATION_HEADER', 'X-JWT-Attestation')
+        app.config.setdefault('JWT_GATEWAY_REQUEST_ID_HEADER', 'X-Request-ID')
+
+        # Resolution in seconds of the timer wheel that closes expired websocket
+        # connections, and the close code sent when it does or when a connection
+        # has no valid token.
+        app.config.setdefault('JWT_WEBSOCKET_TIMER_TICK', 1.0)
+        app.config.setdefault('JWT_WEBSOCKET_CLOSE_CODE', 1008)
+        # Seconds between checks of open websocket connections against the tokens
+        # revoked in the shared state. None disables the checks.
+        app.config.setdefault('JWT_WEBSOCKET_REVOCATION_CHECK_INTERVAL', 5.0)
+
         app.json_encoder = JSONEncoder
 
+    @staticmethod
+    def _compile_claim_aliases(app: Sanic):
+        """
+        :return: Aliases of the claims by claim name, or None if JWT_COMPACT_CLAIMS is disabled
+        """
+        config = app.config
+        if not config.JWT_COMPACT_CLAIMS:
+            return None
+
+        aliases = config.JWT_CLAIM_ALIASES
+        if aliases is None:
+            aliases = {
+                config.JWT_IDENTITY_CLAIM: 'sub',
+                config.JWT_USER_CLAIMS: 'uc',
+                config.JWT_SCOPES_CLAIM: 'sc',
+                'type': 't',
+                'fresh': 'f',
+            }
+
+        aliases = {name: alias for name, alias in aliases.items() if name != alias}
+        if len(set(aliases.values())) != len(aliases):
+            raise ValueError("JWT_CLAIM_ALIASES must not give the same alias to several claims")
+        return aliases
+
+    @staticmethod
+    def _create_shared_state(app: Sanic):
+        """
+        Create the state shared by all workers, or attach to the one the main process created
+        """
+        config = app.config
+        if not config.JWT_SHARED_STATE:
+            return None
+
+        path = config.JWT_SHARED_STATE_PATH
+        if path is None:
+            path = default_state_path(app.name)
+
+        return SharedTokenState(path, slots=config.JWT_SHARED_STATE_SLOTS)
+
+    @staticmethod
+    def _create_admission_controller(max_concurrency, max_queue):
+        """
+        :return: AdmissionController limiting to max_concurrency, or None if it is not set
+        """
+        if max_concurrency is None:
+            return None
+        return AdmissionController(max_concurrency=max_concurrency, max_queue=max_queue)
+
+    @staticmethod
+    def _create_audit_logger(app: Sanic):
+        """
+        Create the audit logger, and flush it when the server stops
+        """
+        config = app.config
+        if config.JWT_AUDIT_SINK is None:
+            return None
+
+        audit = AuditLogger(
+            config.JWT_AUDIT_SINK,
+            max_queue=config.JWT_AUDIT_QUEUE_SIZE,
+            batch_size=config.JWT_AUDIT_BATCH_SIZE,
+            policy=config.JWT_AUDIT_OVERFLOW_POLICY
+        )
+
+        @app.listener('after_server_stop')
+        async def close_audit_logger(app, loop):
+            await audit.close()
+
+        return audit
+
     @staticmethod
     def _set_error_handlers(app: Sanic):
         """
          Sets the error handler callbacks used by this extension
          """
+        from jwt import ExpiredSignatureError, InvalidTokenError
+
+        async def reject(request, e, message, status):
+            audit = app.jwt.audit
+            if audit is not None:
+                await audit.emit({
+                    "event": "rejected",
+                    "time": time.time(),
+                    "error": type(e).__name__,
+                    "message": str(e),
+                    "status": status,
+                    "method": request.method,
+                    "path": request.path,
+                    "ip": request.ip,
+                })
+            return json({app.config.JWT_ERROR_MESSAGE_KEY: message}, status=status)
+
         @app.exception(NoAuthorizationError)
         async def handle_auth_error(request, e):
-            return json({app.config.JWT_ERROR_MESSAGE_KEY: str(e)}, status=401)
+            return await reject(request, e, str(e), 401)
 
         @app.exception(ExpiredSignatureError)
         async def handle_expired_error(request, e):
-            return json({app.config.JWT_ERROR_MESSAGE_KEY: "Token has expired"}, status=401)
+            return await reject(request, e, "Token has expired", 401)
 
         @app.exception(InvalidHeaderError)
         async def handle_invalid_header_error(request, e):
-            return json({app.config.JWT_ERROR_MESSAGE_KEY: str(e)}, status=422)
+            return await reject(request, e, str(e), 422)
 
         @app.exception(InvalidTokenError)
         async def handle_invalid_token_error(request, e):
-            return json({app.config.JWT_ERROR_MESSAGE_KEY: str(e)}, status=422)
+            return await reject(request, e, str(e), 422)
 
         @app.exception(JWTDecodeError)
         async def handle_jwt_decode_error(request, e):
-            return json({app.config.JWT_ERROR_MESSAGE_KEY: str(e)}, status=422)
+            return await reject(request, e, str(e), 422)
 
         @app.exception(WrongTokenError)
         async def handle_wrong_token_error(request, e):
-            return json({app.config.JWT_ERROR_MESSAGE_KEY: str(e)}, status=422)
+            return await reject(request, e, str(e), 422)
+
+        # Registered first, the first handler matching an exception is used
+        @app.exception(TokenAlreadyUsedError)
+        async def handle_token_already_used_error(request, e):
+            return await reject(request, e, str(e), 422)
 
         @app.exception(RevokedTokenError)
         async def handle_revoked_token_error(request, e):
-            return json({app.config.JWT_ERROR_MESSAGE_KEY: "Token has been revoked"}, status=422)
+            return await reject(request, e, "Token has been revoked", 422)
 
         @app.exception(FreshTokenRequired)
         async def handle_fresh_token_required(request, e):
-            return json({app.config.JWT_ERROR_MESSAGE_KEY: "Fresh token required"}, status=422)
+            return await reject(request, e, "Fresh token required", 422)
+
+        @app.exception(UserLoadError)
+        async def handle_user_load_error(request, e):
+            return await reject(request, e, str(e), 401)
+
+        @app.exception(InsufficientScopeError)
+        async def handle_insufficient_scope_error(request, e):
+            return await reject(request, e, str(e), 403)
+
+        @app.exception(ServiceOverloadedError)
+        async def handle_service_overloaded_error(request, e):
+            return await reject(request, e, str(e), 503)
+
+        # Rejected requests are cheap to answer, the body is only rendered once
+        rate_limit_bodies = {}
+
+        @app.exception(RateLimitExceededError)
+        async def handle_rate_limit_exceeded_error(request, e):
+            if app.jwt.audit is not None:
+                await reject(request, e, str(e), 429)
+
+            key = app.config.JWT_ERROR_MESSAGE_KEY
+            body = rate_limit_bodies.get(key)
+            if body is None:
+                body = rate_limit_bodies[key] = dumps({key: "Rate limit exceeded"}, separators=(",", ":"))
+            return HTTPResponse(body, status=429, headers={"Retry-After": str(math.ceil(e.retry_after))},
+                                content_type="application/json")
+
+    @staticmethod
+    def _load_key(algorithm: str, key):
+        """
+        Load a PEM encoded asymmetric key into a key object
+        """
+        if not isinstance(key, (str, bytes)):
+            return key
+
+        # Crypto backends are only loaded once an asymmetric algorithm is configured
+        from sanic_jwt_extended.algorithms import get_algorithm
+
+        return get_algorithm(algorithm).prepare_key(key)
+
+    def _prepare_key(self, algorithm: str, key):
+        """
+        Load an asymmetric key once and keep the loaded key object, so PEM parsing
+        does not happen again on every sign and verify
+        """
+        if not isinstance(key, (str, bytes)):
+            return key
+
+        cache_key = (algorithm, key)
+        prepared = self._prepared_keys.get(cache_key)
+        if prepared is None:
+            prepared = self._load_key(algorithm, key)
+            self._prepared_keys[cache_key] = prepared
+        return prepared
+
+    def tenant_key_loader(self, callback):
+        """
+        This decorator sets the callback function used to load the keys of a tenant
+        when tokens are signed and verified with per tenant keys. The tenant of a token
+        is stored in the `JWT_TENANT_CLAIM` claim.
+
+        The callback is a coroutine function taking the tenant, returning its secret
+        for symmetric algorithms, or a ``(private_key, public_key)`` tuple for asymmetric
+        algorithms (the private key can be None on services that only verify tokens).
+        It returns None for unknown tenants. Loaded keys are cached, unknown tenants are
+        cached for `JWT_UNKNOWN_TENANT_CACHE_TTL` seconds, and concurrent loads for the
+        same tenant share a single call.
+
+        :param callback: The coroutine function loading tenant keys
+        :return: The callback
+        """
+        self._callbacks['tenant_key_loader'] = callback
+        return callback
+
+    def user_loader(self, callback):
+        """
+        This decorator sets the callback function used to load the user of a token.
+        Protected endpoints then get the loaded user as
+        :py:attr:`~sanic_jwt_extended.tokens.Token.current_user`.
+
+        The callback is a coroutine function taking the identity of a token and
+        returning the user, or None if the user does not exist (which rejects the
+        request with a 401). Loaded users are cached by identity
+        (`JWT_USER_CACHE_SIZE`, `JWT_USER_CACHE_TTL`), and concurrent loads for the
+        same identity share a single call.
+
+        :param callback: The coroutine function loading users
+        :return: The callback
+        """
+        self._callbacks['user_loader'] = callback
+        return callback
+
+    def user_claims_loader(self, callback):
+        """
+        This decorator sets the callback function used to get the user claims of a
+        token when :func:`~sanic_jwt_extended.create_access_token` is called without them.
+
+        The callback is a coroutine function taking the identity and returning a
+        dictionary of user claims. Results are cached by identity
+        (`JWT_USER_CLAIMS_CACHE_SIZE`, `JWT_USER_CLAIMS_CACHE_TTL`), and concurrent
+        loads for the same identity share a single call.
+
+        :param callback: The coroutine function loading user claims
+        :return: The callback
+        """
+        self._callbacks['user_claims_loader'] = callback
+        return callback
+
+    @property
+    def _tenant_key_loader(self):
+        return self._callbacks['tenant_key_loader']
+
+    @property
+    def _user_loader(self):
+        return self._callbacks['user_loader']
+
+    @property
+    def _user_claims_loader(self):
+        return self._callbacks['user_claims_loader']
 
     @staticmethod
-    async def _create_refresh_token(app: Sanic, identity, user_claims, expires_delta=None):
+    def _identity_key(identity):
+        # Identities can be any json serializable data, which may not be hashable
+        if isinstance(identity, (dict, list)):
+            return dumps(identity, sort_keys=True)
+        return identity
+
+    async def _load_user(self, identity):
+        """
+        :return: The user of an identity, loaded through the user loader callback
+        """
+        async def load():
+            user = await self._user_loader(identity)
+            if user is None:
+                raise UserLoadError("Error loading the user {}".format(identity))
+            return user
+
+        return await self.user_cache.get_or_load(self._identity_key(identity), load)
+
+    async def _load_user_claims(self, identity):
+        """
+        :return: The user claims of an identity, loaded through the user claims loader callback
+        """
+        return await self.user_claims_cache.get_or_load(
+            self._identity_key(identity), lambda: self._user_claims_loader(identity)
+        )
+
+    async def _get_tenant_keys(self, app: Sanic, tenant: str):
+        """
+        :return: Tuple of the keys used to sign and to verify tokens of a tenant
+        """
+        if self.unknown_tenant_cache.get(tenant, False):
+            raise JWTDecodeError("Unknown tenant: {}".format(tenant))
+
+        async def load():
+            keys = await self._tenant_key_loader(tenant)
+            if keys is None:
+                self.unknown_tenant_cache.set(tenant, True)
+                raise JWTDecodeError("Unknown tenant: {}".format(tenant))
+
+            algorithm = app.config.JWT_ALGORITHM
+            if algorithm.startswith('HS'):
+                return keys, keys
+            private_key, public_key = keys
+            return self._load_key(algorithm, private_key), self._load_key(algorithm, public_key)
+
+        return await self.tenant_key_cache.get_or_load(tenant, load)
+
+    def _get_encode_key(self, app: Sanic):
+        """
+        :return: The key used to sign tokens for the configured algorithm
+        """
+        algorithm = app.config.JWT_ALGORITHM
+        if algorithm.startswith('HS'):
+            return app.config.JWT_SECRET_KEY
+        return self._prepare_key(algorithm, app.config.JWT_PRIVATE_KEY)
+
+    def _get_decode_key(self, app: Sanic):
+        """
+        :return: The key used to verify tokens for the configured algorithm
+        """
+        algorithm = app.config.JWT_ALGORITHM
+        if algorithm.startswith('HS'):
+            return app.config.JWT_SECRET_KEY
+        return self._prepare_key(algorithm, app.config.JWT_PUBLIC_KEY)
+
+    def _was_reissued(self, jti: str) -> bool:
+        """
+        :return: True if the token with this jti has already been re-issued by this worker
+        """
+        now = time.time()
+        # Tokens enter the sliding window in roughly expiry order, so expired
+        # entries are found at the front.
+        while self._reissued:
+            oldest_jti, oldest_exp = next(iter(self._reissued.items()))
+            if oldest_exp > now:
+                break
+            del self._reissued[oldest_jti]
+
+        return jti in self._reissued
+
+    def _mark_reissued(self, jti: str, exp: int) -> None:
+        """
+        Remember that the token with this jti has been re-issued by this worker, until it expires
+        """
+        self._reissued[jti] = exp
+
+    async def _audit_issued(self, app: Sanic, encoded_token: str, identity, tenant=None):
+        """
+        Record an issued token in the audit log
+        """
+        claims = peek_claims(encoded_token, self._claim_aliases[app])
+        await self.audit.emit({
+            "event": "issued",
+            "time": time.time(),
+            "type": claims["type"],
+            "jti": claims["jti"],
+            "identity": identity,
+            "tenant": tenant,
+            "exp": claims.get("exp"),
+        })
+
+    def _get_token_extractor(self, app: Sanic, token_type: str):
+        """
+        Compile JWT_TOKEN_LOCATION into a token extractor once per application and token type
+        and reuse it afterwards
+        """
+        extractor = self._token_extractors.get((app, token_type))
+        if extractor is None:
+            extractor = compile_token_extractor(app.config, token_type)
+            self._token_extractors[app, token_type] = extractor
+        return extractor
+
+    def _scope_mask(self, app: Sanic, scopes: frozenset) -> int:
+        """
+        Compile scope names into a bitmask once per application and reuse it afterwards
+        """
+        mask = self._scope_masks.get((app, scopes))
+        if mask is None:
+            unknown = scopes.difference(app.config.JWT_SCOPES)
+            if unknown:
+                raise ValueError("Scopes missing from JWT_SCOPES: {}".format(", ".join(sorted(unknown))))
+            mask = compile_scopes(scopes, app.config.JWT_SCOPES)
+            self._scope_masks[app, scopes] = mask
+        return mask
+
+    async def _sign(self, encode, **kwargs) -> str:
+        """
+        Encode a token, in the thread pool of the signing admission controller if enabled
+        """
+        if self.signing_admission is None:
+            return encode(**kwargs)
+        return await self.signing_admission.run(encode, **kwargs)
+
+    async def _create_refresh_token(self, app: Sanic, identity, user_claims, expires_delta=None, tenant=None):
         config = app.config
 
         if expires_delta is None:
             expires_delta = config.JWT_REFRESH_TOKEN_EXPIRES
 
+        if user_claims is None and self._user_claims_loader is not None and config.JWT_CLAIMS_IN_REFRESH_TOKEN:
+            user_claims = await self._load_user_claims(identity)
+
         if config.JWT_CLAIMS_IN_REFRESH_TOKEN:
             user_claims = user_claims
         else:
             user_claims = None
 
-        refresh_token = await encode_refresh_token(
+        if tenant is not None:
+            secret = (await self._get_tenant_keys(app, tenant))[0]
+        else:
+            secret = self._get_encode_key(app)
+
+        refresh_token = await self._sign(
+            encode_refresh_token_sync,
             identity=identity,
-            secret=config.JWT_SECRET_KEY,
+            secret=secret,
             algorithm=config.JWT_ALGORITHM,
             expires_delta=expires_delta,
             user_claims=user_claims,
             identity_claim_key=config.JWT_IDENTITY_CLAIM,
             user_claims_key=config.JWT_USER_CLAIMS,
-            json_encoder=app.json_encoder
+            json_encoder=app.json_encoder,
+            tenant=tenant,
+            tenant_claim_key=config.JWT_TENANT_CLAIM,
+            claim_aliases=self._claim_aliases[app],
+            compress_min_size=config.JWT_COMPRESS_MIN_SIZE if config.JWT_COMPRESS_CLAIMS else None
         )
 
+        if self.audit is not None:
+            await self._audit_issued(app, refresh_token, identity, tenant)
+
         return refresh_token
 
-    @staticmethod
-    async def _create_access_token(app: Sanic, identity, user_claims, fresh, expires_delta=None):
+    async def _create_access_token(self, app: Sanic, identity, user_claims, fresh, expires_delta=None,
+                                   scopes=None, tenant=None):
         config = app.config
 
         if expires_delta is None:
             expires_delta = config.JWT_ACCESS_TOKEN_EXPIRES
 
-        access_token = await encode_access_token(
+        if user_claims is None and self._user_claims_loader is not None:
+            user_claims = await self._load_user_claims(identity)
+
+        # Scopes of a re-issued token may already be compiled into a bitmask
+        if scopes is not None and not isinstance(scopes, int):
+            if config.JWT_COMPACT_SCOPES:
+                scopes = self._scope_mask(app, frozenset(scopes))
+            else:
+                scopes = list(scopes)
+
+        if tenant is not None:
+            secret = (await self._get_tenant_keys(app, tenant))[0]
+        else:
+            secret = self._get_encode_key(app)
+
+        access_token = await self._sign(
+            encode_access_token_sync,
             identity=identity,
-            secret=config.JWT_SECRET_KEY,
+            secret=secret,
             algorithm=config.JWT_ALGORITHM,
             expires_delta=expires_delta,
             fresh=fresh,
             user_claims=user_claims,
             identity_claim_key=config.JWT_IDENTITY_CLAIM,
             user_claims_key=config.JWT_USER_CLAIMS,
-            json_encoder=app.json_encoder
+            json_encoder=app.json_encoder,
+            scopes=scopes,
+            scopes_claim_key=config.JWT_SCOPES_CLAIM,
+            tenant=tenant,
+            tenant_claim_key=config.JWT_TENANT_CLAIM,
+            claim_aliases=self._claim_aliases[app],
+            compress_min_size=config.JWT_COMPRESS_MIN_SIZE if config.JWT_COMPRESS_CLAIMS else None
         )
+
+        if self.audit is not None:
+            await self._audit_issued(app, access_token, identity, tenant)
+
+        if config.JWT_REFERENCE_TOKENS:
+            reference = secrets.token_urlsafe(32)
+            expires_in = expires_delta.total_seconds() if expires_delta else None
+            await self.reference_token_store.set(reference, access_token, expires_in)
+            return reference
+
         return access_token
@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class TokenBucketTable:
+    """
+    Memory bounded table of token buckets, one per key.
+    Buckets are refilled lazily when they are used. A bucket left alone long enough to be
+    full again is the same as a new one, so it is evicted. If the table is still full,
+    the least recently used bucket is evicted.
+    """
+    def __init__(self, rate: float, capacity: float, max_entries: int = 10000):
+        """
+        :param rate: Tokens added to a bucket per second
+        :param capacity: Maximum number of tokens in a bucket (the allowed burst)
+        :param max_entries: Maximum number of buckets kept
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.max_entries = max_entries
+        self.idle_time = capacity / rate
+        self._buckets = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def consume(self, key: Hashable) -> float:
+        """
+        Take a token from the bucket of a key.
+
+        :param key: Key of the bucket (ex: an identity)
+        :return: 0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            tokens = self.capacity
+        else:
+            tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            self._buckets.move_to_end(key)
+
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            wait = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            wait = (1 - tokens) / self.rate
+
+        self._evict(now)
+        return wait
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if len(buckets) <= self.max_entries and oldest[1] + self.idle_time > now:
+                break
+            buckets.popitem(last=False)
@@ -0,0 +1,67 @@
+import time
+from typing import Optional
+
+
+class ReferenceTokenStore:
+    """
+    Interface of the store that maps opaque reference tokens to the JWTs they stand for.
+    Implement it on top of a shared service (such as redis) when running several workers
+    or servers. Methods are coroutines so implementations can do network I/O.
+    """
+    async def set(self, reference: str, encoded_token: str, expires_in: Optional[float]) -> None:
+        """
+        :param reference: Opaque reference given to the client
+        :param encoded_token: The encoded JWT the reference stands for
+        :param expires_in: Seconds until the token expires, None if it never expires
+        """
+        raise NotImplementedError
+
+    async def get(self, reference: str) -> Optional[str]:
+        """
+        :param reference: Opaque reference given to the client
+        :return: The encoded JWT, or None if the reference is unknown, expired or revoked
+        """
+        raise NotImplementedError
+
+    async def delete(self, reference: str) -> None:
+        """
+        :param reference: Opaque reference to revoke
+        """
+        raise NotImplementedError
+
+
+class InMemoryReferenceTokenStore(ReferenceTokenStore):
+    """
+    Reference token store kept in the memory of the process. Only suitable for a
+    single worker, as references are not visible to other processes.
+    """
+    def __init__(self):
+        self._tokens = {}
+        self._sweep_at = 1024
+
+    async def set(self, reference: str, encoded_token: str, expires_in: Optional[float]) -> None:
+        expires_at = None if expires_in is None else time.time() + expires_in
+        self._tokens[reference] = (encoded_token, expires_at)
+
+        # Expired references are dropped in bulk whenever the store has doubled in size
+        if len(self._tokens) >= self._sweep_at:
+            now = time.time()
+            self._tokens = {
+                reference: entry for reference, entry in self._tokens.items()
+                if entry[1] is None or entry[1] > now
+            }
+            self._sweep_at = max(1024, len(self._tokens) * 2)
+
+    async def get(self, reference: str) -> Optional[str]:
+        entry = self._tokens.get(reference)
+        if entry is None:
+            return None
+
+        encoded_token, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._tokens[reference]
+            return None
+        return encoded_token
+
+    async def delete(self, reference: str) -> None:
+        self._tokens.pop(reference, None)
@@ -0,0 +1,29 @@
+from typing import Iterable, List, Sequence
+
+
+def compile_scopes(scopes: Iterable[str], known_scopes: Sequence[str]) -> int:
+    """
+    Compile scope names into a bitmask. The bit of a scope is its position in known_scopes.
+
+    :param scopes: Scope names to compile
+    :param known_scopes: Ordered list of every scope name (``JWT_SCOPES``)
+    :return: Bitmask with the bit of each given scope set
+    """
+    mask = 0
+    for scope in scopes:
+        try:
+            mask |= 1 << known_scopes.index(scope)
+        except ValueError:
+            raise ValueError("Unknown scope: {}".format(scope))
+    return mask
+
+
+def expand_scopes(mask: int, known_scopes: Sequence[str]) -> List[str]:
+    """
+    Expand a bitmask created by :func:`compile_scopes` back into scope names.
+
+    :param mask: Scope bitmask
+    :param known_scopes: Ordered list of every scope name (``JWT_SCOPES``)
+    :return: List of scope names
+    """
+    return [scope for bit, scope in enumerate(known_scopes) if mask & (1 << bit)]
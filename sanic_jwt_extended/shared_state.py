@@ -0,0 +1,298 @@
+import atexit
+import hashlib
+import mmap
+import os
+import re
+import stat
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+def default_state_path(name: str) -> str:
+    """
+    :param name: Name of the application the state belongs to
+    :return: Path of the shared state file of this process and application, in a directory
+             private to the current user on /dev/shm (or the temporary directory if there is none)
+    """
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    directory = os.path.join(base, 'sanic-jwt-extended-{}'.format(os.geteuid()))
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.geteuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise RuntimeError("Refusing to use {}: it must be a directory owned by this user with "
+                           "mode 0700".format(directory))
+    return os.path.join(directory, '{}-{}.state'.format(os.getpid(), re.sub(r'[^\w.-]', '_', name)))
+
+
+class SharedTokenState:
+    """
+    Verified token, revoked jti and consumed single use jti sets shared by every worker
+    of an application.
+    Entries live in a fixed-slot hash table in a memory mapped file, so a token
+    verified or revoked in one worker is seen by all of them without an external service.
+
+    The process that opens the file first creates it, processes started afterwards
+    (forked or spawned workers) attach to it. Only a regular file owned by the current
+    user with mode 0600 is attached to, and symbolic links are never followed.
+    Verified entries are keyed with the key tokens are verified with, so they stop
+    matching once it is rotated. Lookups are lock free, inserts take an exclusive lock
+    on the file. Entries are dropped once the token they belong to has expired, and
+    slots of expired entries are reused.
+    """
+    MAGIC = b'SJWTST01'
+    HEADER = struct.Struct('<8sII')
+    HEADER_SIZE = 64
+    SLOT = struct.Struct('<16sQB7x')
+    PROBES = 8
+    NEVER_EXPIRES = 2 ** 64 - 1
+    MAX_VERIFICATION_KEYS = 1024
+
+    VERIFIED = 1
+    REVOKED = 2
+    CONSUMED = 3
+
+    def __init__(self, path: str, slots: int = 65536):
+        """
+        Create the shared state file or attach to the one created by the main process.
+
+        :param path: Path of the memory mapped file, preferably on a tmpfs such as /dev/shm
+        :param slots: Number of entries the table can hold. Ignored when attaching
+        """
+        if fcntl is None:
+            raise RuntimeError("Shared token state requires a POSIX system")
+
+        self.path = path
+        self._verification_keys = {}
+        self._fd = self._open_file(path)
+
+        try:
+            with self._lock():
+                self.slots, self.created = self._open(slots)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+        self._map = mmap.mmap(self._fd, self.HEADER_SIZE + self.slots * self.SLOT.size)
+
+        if self.created:
+            creator = os.getpid()
+
+            def cleanup():
+                # Forked workers inherit this handler, only the creator removes the file
+                if os.getpid() == creator:
+                    self.unlink()
+
+            atexit.register(cleanup)
+
+    @staticmethod
+    def _open_file(path: str) -> int:
+        flags = os.O_RDWR | getattr(os, 'O_NOFOLLOW', 0)
+        try:
+            fd = os.open(path, flags | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            # The mode given to open is reduced by the umask
+            os.fchmod(fd, 0o600)
+            return fd
+
+        fd = os.open(path, flags)
+        info = os.fstat(fd)
+        if not stat.S_ISREG(info.st_mode) or info.st_uid != os.geteuid() or stat.S_IMODE(info.st_mode) != 0o600:
+            os.close(fd)
+            raise RuntimeError("Refusing to use shared token state {}: it must be a regular file owned "
+                               "by this user with mode 0600".format(path))
+        return fd
+
+    def _open(self, slots: int):
+        header = os.pread(self._fd, self.HEADER.size, 0)
+        if len(header) == self.HEADER.size:
+            magic, existing_slots, creator = self.HEADER.unpack(header)
+            if magic == self.MAGIC and creator != os.getpid() and self._is_alive(creator):
+                return existing_slots, False
+
+        # Missing, or left behind by a process that is gone: start from an empty table
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, self.HEADER_SIZE + slots * self.SLOT.size)
+        os.pwrite(self._fd, self.HEADER.pack(self.MAGIC, slots, os.getpid()), 0)
+        return slots, True
+
+    @staticmethod
+    def _is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    @contextmanager
+    def _lock(self):
+        # POSIX record locks belong to the process, so they also exclude forked workers
+        # sharing this file descriptor
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _digest(kind: int, value: str, key: bytes = b'') -> bytes:
+        return hashlib.blake2b(value.encode('utf-8'), digest_size=16, key=key, person=bytes([kind])).digest()
+
+    def _verification_key(self, secret) -> bytes:
+        """
+        Derive the key of verified entries from the key tokens are verified with
+
+        :param secret: Secret, or public key object, tokens are verified with
+        """
+        # Key objects are not hashable. Holding the secret keeps its id from being reused
+        cached = self._verification_keys.get(id(secret))
+        if cached is not None and cached[0] is secret:
+            return cached[1]
+
+        if isinstance(secret, str):
+            material = secret.encode('utf-8')
+        elif isinstance(secret, bytes):
+            material = secret
+        else:
+            from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+            public_key = secret.public_key() if hasattr(secret, 'public_key') else secret
+            material = public_key.public_bytes(Encoding.DER, PublicFormat.SubjectPublicKeyInfo)
+        key = hashlib.blake2b(material, digest_size=32, person=b'sjwt-verified').digest()
+
+        if len(self._verification_keys) >= self.MAX_VERIFICATION_KEYS:
+            # Reloaded tenant keys are new objects, start over rather than grow forever
+            self._verification_keys.clear()
+        self._verification_keys[id(secret)] = (secret, key)
+        return key
+
+    def _offsets(self, digest: bytes):
+        index = int.from_bytes(digest[:8], 'little')
+        for probe in range(self.PROBES):
+            yield self.HEADER_SIZE + ((index + probe) % self.slots) * self.SLOT.size
+
+    def _contains(self, kind: int, value: str, key: bytes = b'') -> bool:
+        digest = self._digest(kind, value, key)
+        now = time.time()
+        for offset in self._offsets(digest):
+            key, expires, _ = self.SLOT.unpack_from(self._map, offset)
+            if key == digest:
+                return expires > now
+        return False
+
+    def _add(self, kind: int, value: str, expires: int, only_new: bool = False, key: bytes = b'') -> bool:
+        """
+        Insert or extend an entry. Verified entries are only a cache, they are silently
+        dropped when the table is full, while other entries raise RuntimeError.
+
+        :return: False if only_new is set and a live entry already exists
+        """
+        digest = self._digest(kind, value, key)
+        now = time.time()
+
+        with self._lock():
+            free = None
+            evictable = None
+            evictable_expires = None
+
+            for offset in self._offsets(digest):
+                key, slot_expires, slot_kind = self.SLOT.unpack_from(self._map, offset)
+                if key == digest:
+                    if only_new and slot_expires > now:
+                        return False
+                    free = offset
+                    expires = max(expires, slot_expires)
+                    break
+                if slot_expires <= now:
+                    if free is None:
+                        free = offset
+                elif slot_kind == self.VERIFIED and (evictable is None or slot_expires < evictable_expires):
+                    # Verified entries make room for new entries
+                    evictable, evictable_expires = offset, slot_expires
+
+            offset = free if free is not None else evictable
+            if offset is None:
+                if kind == self.VERIFIED:
+                    return True
+                raise RuntimeError("Shared token state is full, increase JWT_SHARED_STATE_SLOTS")
+
+            self.SLOT.pack_into(self._map, offset, digest, expires, kind)
+            return True
+
+    def is_verified(self, encoded_token: str, secret) -> bool:
+        """
+        :param encoded_token: The encoded JWT string
+        :param secret: Secret, or public key object, the token is verified with
+        :return: True if a worker already verified the signature of this token with this key
+        """
+        return self._contains(self.VERIFIED, encoded_token, self._verification_key(secret))
+
+    def mark_verified(self, encoded_token: str, expires: int, secret) -> None:
+        """
+        Record that the signature of a token is valid, until the token expires
+
+        :param encoded_token: The encoded JWT string
+        :param expires: Expiration time of the token (its exp claim), None if it never expires
+        :param secret: Secret, or public key object, the token was verified with
+        """
+        self._add(self.VERIFIED, encoded_token, self.NEVER_EXPIRES if expires is None else expires,
+                  key=self._verification_key(secret))
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        :param jti: The jti claim of a token
+        :return: True if the token has been revoked
+        """
+        return self._contains(self.REVOKED, jti)
+
+    def revoke(self, jti: str, expires: int = None) -> None:
+        """
+        Revoke a token for every worker, until it expires
+
+        :param jti: The jti claim of the token
+        :param expires: Expiration time of the token (its exp claim), None if it never expires
+        """
+        self._add(self.REVOKED, jti, self.NEVER_EXPIRES if expires is None else expires)
+
+    def consume(self, jti: str, expires: int) -> bool:
+        """
+        Mark a single use token as used, atomically for all workers, until it expires
+
+        :param jti: The jti claim of the token
+        :param expires: Expiration time of the token (its exp claim)
+        :return: False if the token was already used
+        """
+        return self._add(self.CONSUMED, jti, expires, only_new=True)
+
+    def close(self) -> None:
+        """
+        Unmap the table and close the file
+        """
+        if self._fd is None:
+            return
+        self._map.close()
+        os.close(self._fd)
+        self._fd = None
+
+    def unlink(self) -> None:
+        """
+        Close and remove the file backing the table
+        """
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
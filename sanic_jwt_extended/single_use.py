@@ -0,0 +1,48 @@
+import heapq
+import time
+
+
+class ConsumedJtiSet:
+    """
+    Set of consumed jti values, bucketed by the expiry time of their token.
+    A jti is only ever looked up in the bucket of its token's exp, so lookups are O(1).
+    Once every token of a bucket has expired, the whole bucket is dropped instead of
+    scanning entries one by one, so memory stays proportional to tokens still alive.
+    """
+    def __init__(self, bucket_seconds: float = 60):
+        """
+        :param bucket_seconds: Width in seconds of the expiry range covered by one bucket
+        """
+        self.bucket_seconds = bucket_seconds
+        self._buckets = {}
+        self._bucket_order = []
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def consume(self, jti: str, expires: int) -> bool:
+        """
+        Mark a jti as used.
+
+        :param jti: The jti claim of the token
+        :param expires: The exp claim of the token
+        :return: False if the jti was already used
+        """
+        self._drop_expired(time.time())
+
+        index = int(expires // self.bucket_seconds)
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            bucket = self._buckets[index] = set()
+            heapq.heappush(self._bucket_order, index)
+        elif jti in bucket:
+            return False
+
+        bucket.add(jti)
+        return True
+
+    def _drop_expired(self, now: float) -> None:
+        # A bucket only holds tokens that expired by the end of its range
+        order = self._bucket_order
+        while order and (order[0] + 1) * self.bucket_seconds <= now:
+            del self._buckets[heapq.heappop(order)]
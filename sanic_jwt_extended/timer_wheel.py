@@ -0,0 +1,110 @@
+import asyncio
+from typing import Callable, List, Optional, Set
+
+
+class TimerHandle:
+    """
+    Handle returned by :meth:`TimerWheel.schedule`, used to cancel a pending timer
+    """
+    __slots__ = ("callback", "rounds", "slot", "cancelled")
+
+    def __init__(self, callback: Callable[[], None], rounds: int, slot: int):
+        self.callback = callback
+        self.rounds = rounds
+        self.slot = slot
+        self.cancelled = False
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel shared by many long-lived connections.
+    Scheduling and cancelling a timer is O(1) and a single background task advances
+    the wheel once per tick, so thousands of open sockets cost one task instead of one
+    timer each. Timers fire with a resolution of one tick.
+    """
+    def __init__(self, tick: float = 1.0, slots: int = 512):
+        """
+        :param tick: Resolution of the wheel in seconds
+        :param slots: Number of buckets in the wheel
+        """
+        self.tick = tick
+        self.slots: List[Set[TimerHandle]] = [set() for _ in range(slots)]
+        self.cursor = 0
+        self.count = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> TimerHandle:
+        """
+        Schedule callback to be called after delay seconds.
+
+        :param delay: Seconds from now until callback is called
+        :param callback: Plain callable invoked from the event loop
+        :return: TimerHandle that can be passed to :meth:`cancel`
+        """
+        ticks = max(1, int(-(-delay // self.tick)))
+        # The wheel advances before firing a slot, so a timer due in n ticks goes
+        # n slots ahead. Exact multiples of the slot count land on the current slot,
+        # which is reached again after one revolution, not zero.
+        rounds, offset = divmod(ticks - 1, len(self.slots))
+        slot = (self.cursor + offset + 1) % len(self.slots)
+
+        handle = TimerHandle(callback, rounds, slot)
+        self.slots[slot].add(handle)
+        self.count += 1
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+        return handle
+
+    def cancel(self, handle: TimerHandle) -> None:
+        """
+        Cancel a pending timer. Cancelling an already fired timer does nothing.
+
+        :param handle: TimerHandle returned by :meth:`schedule`
+        """
+        if handle.cancelled:
+            return
+        handle.cancelled = True
+        bucket = self.slots[handle.slot]
+        if handle in bucket:
+            bucket.discard(handle)
+            self.count -= 1
+
+    def _advance(self) -> None:
+        self.cursor = (self.cursor + 1) % len(self.slots)
+        bucket = self.slots[self.cursor]
+        expired = []
+
+        for handle in bucket:
+            if handle.rounds:
+                handle.rounds -= 1
+            else:
+                expired.append(handle)
+
+        for handle in expired:
+            bucket.discard(handle)
+            handle.cancelled = True
+            self.count -= 1
+
+        # A failing callback must not stop the wheel or the other callbacks
+        for handle in expired:
+            try:
+                handle.callback()
+            except Exception as e:
+                asyncio.get_event_loop().call_exception_handler({
+                    "message": "Exception in timer wheel callback",
+                    "exception": e,
+                })
+
+    async def _run(self) -> None:
+        loop = asyncio.get_event_loop()
+        next_tick = loop.time()
+
+        while self.count:
+            next_tick += self.tick
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            self._advance()
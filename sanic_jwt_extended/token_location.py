@@ -0,0 +1,123 @@
+from typing import Callable, List, Optional, TYPE_CHECKING
+
+from sanic_jwt_extended.exceptions import NoAuthorizationError, InvalidHeaderError
+
+if TYPE_CHECKING:
+    from sanic.request import Request
+
+LOCATIONS = ("headers", "cookies", "query_string", "json")
+
+
+def _header_lookup(config) -> Callable[['Request'], Optional[str]]:
+    header_name: str = config.JWT_HEADER_NAME
+    header_type: str = config.JWT_HEADER_TYPE
+
+    def lookup(request: 'Request') -> Optional[str]:
+        token_header: str = request.headers.get(header_name)
+        if not token_header:
+            return None
+
+        parts: List[str] = token_header.split()
+
+        if not header_type:
+            if len(parts) != 1:
+                msg = "Bad {} header. Expected value '<JWT>'".format(header_name)
+                raise InvalidHeaderError(msg)
+            return parts[0]
+
+        if parts[0] != header_type or len(parts) != 2:
+            msg = "Bad {} header. Expected value '{} <JWT>'".format(
+                header_name,
+                header_type
+            )
+            raise InvalidHeaderError(msg)
+        return parts[1]
+
+    return lookup
+
+
+def _cookie_lookup(cookie_name: str) -> Callable[['Request'], Optional[str]]:
+    def lookup(request: 'Request') -> Optional[str]:
+        return request.cookies.get(cookie_name) or None
+    return lookup
+
+
+def _query_string_lookup(parameter_name: str) -> Callable[['Request'], Optional[str]]:
+    def lookup(request: 'Request') -> Optional[str]:
+        return request.args.get(parameter_name) or None
+    return lookup
+
+
+def _json_lookup(key: str) -> Callable[['Request'], Optional[str]]:
+    def lookup(request: 'Request') -> Optional[str]:
+        if not request.body or not (request.content_type or "").startswith("application/json"):
+            return None
+        data = request.json
+        if not isinstance(data, dict):
+            return None
+        token = data.get(key)
+        return token if isinstance(token, str) and token else None
+    return lookup
+
+
+def compile_token_extractor(config, token_type: str) -> Callable[['Request'], str]:
+    """
+    Compile ``JWT_TOKEN_LOCATION`` into a function extracting the encoded token from a request.
+    The configuration is read once here: each request then runs one lookup per configured
+    location, in the configured order, and the first token found is used.
+
+    :param config: Configuration of a Sanic application
+    :param token_type: Type of the token to extract (``'access'`` or ``'refresh'``), which
+                       selects the cookie name and json key
+    :return: Function taking a request and returning the encoded token. It raises
+             NoAuthorizationError when no location has a token, and InvalidHeaderError
+             when the header is malformed
+    """
+    locations = config.JWT_TOKEN_LOCATION
+    if isinstance(locations, str):
+        locations = [locations]
+    if not locations:
+        raise ValueError("JWT_TOKEN_LOCATION must contain at least one location")
+
+    lookups = []
+    missing = []
+    for location in locations:
+        if location == "headers":
+            lookups.append(_header_lookup(config))
+            missing.append("Missing {} Header".format(config.JWT_HEADER_NAME))
+        elif location == "cookies":
+            name = config.JWT_ACCESS_COOKIE_NAME if token_type == "access" else config.JWT_REFRESH_COOKIE_NAME
+            lookups.append(_cookie_lookup(name))
+            missing.append('Missing cookie "{}"'.format(name))
+        elif location == "query_string":
+            name = config.JWT_QUERY_STRING_NAME
+            lookups.append(_query_string_lookup(name))
+            missing.append('Missing "{}" query parameter'.format(name))
+        elif location == "json":
+            key = config.JWT_JSON_KEY if token_type == "access" else config.JWT_REFRESH_JSON_KEY
+            lookups.append(_json_lookup(key))
+            missing.append('Missing "{}" key in json data'.format(key))
+        else:
+            raise ValueError("Unknown JWT_TOKEN_LOCATION {!r}, expected one of: {}".format(
+                location, ", ".join(LOCATIONS)))
+
+    if len(lookups) == 1:
+        lookup = lookups[0]
+        message = missing[0]
+
+        def extract(request: 'Request') -> str:
+            token = lookup(request)
+            if token is None:
+                raise NoAuthorizationError(message)
+            return token
+    else:
+        message = "Missing JWT in {} ({})".format(" or ".join(locations), "; ".join(missing))
+
+        def extract(request: 'Request') -> str:
+            for lookup in lookups:
+                token = lookup(request)
+                if token is not None:
+                    return token
+            raise NoAuthorizationError(message)
+
+    return extract
@@ -1,17 +1,40 @@
+import base64
 import datetime
+import json
 import uuid
+import zlib
 
 from calendar import timegm
-from typing import Union, Dict, Callable
-
-import jwt
+from typing import Union, Dict, Callable, List, TYPE_CHECKING
 
 from sanic_jwt_extended.exceptions import JWTDecodeError
-from sanic import Sanic
+from sanic_jwt_extended.scopes import expand_scopes
+
+if TYPE_CHECKING:
+    from sanic import Sanic
+
+
+def _import_jwt(algorithm: str):
+    """
+    Import PyJWT on first use, so importing this module does not load PyJWT and its crypto
+    backends. Algorithms that PyJWT does not ship with are registered when first requested.
+    """
+    import jwt
+
+    if algorithm == 'EdDSA':
+        from sanic_jwt_extended.algorithms import register_algorithms
+        register_algorithms()
+
+    return jwt
+
+
+# Compressed payloads inflating past this size are rejected
+_MAX_INFLATED_SIZE = 1024 * 1024
 
 
 def _encode_jwt(additional_token_data: dict, expires_delta: datetime.timedelta, secret: str, algorithm: str,
-                json_encoder: Callable[..., str]) -> str:
+                json_encoder: Callable[..., str], claim_aliases: Dict[str, str] = None,
+                compress_min_size: int = None) -> str:
     uid = str(uuid.uuid4())
     now = datetime.datetime.utcnow()
     token_data = {
@@ -24,20 +47,88 @@ def _encode_jwt(additional_token_data: dict, expires_delta: datetime.timedelta,
     if expires_delta:
         token_data['exp'] = now + expires_delta
     token_data.update(additional_token_data)
-    encoded_token = jwt.encode(token_data, secret, algorithm,
-                               json_encoder=json_encoder).decode('utf-8')
-    return encoded_token
 
+    if claim_aliases:
+        token_data = {claim_aliases.get(key, key): value for key, value in token_data.items()}
 
-async def encode_access_token(identity: str, secret: str, algorithm: str, expires_delta: datetime.timedelta,
-                              fresh: Union[datetime.timedelta, bool],
-                              user_claims: dict, identity_claim_key: str, user_claims_key: str,
-                              json_encoder: Callable[..., str] = None) -> str:
+    jwt = _import_jwt(algorithm)
+    if compress_min_size is None:
+        return jwt.encode(token_data, secret, algorithm, json_encoder=json_encoder).decode('utf-8')
+
+    for claim in ('exp', 'iat', 'nbf'):
+        if isinstance(token_data.get(claim), datetime.datetime):
+            token_data[claim] = timegm(token_data[claim].utctimetuple())
+    payload = json.dumps(token_data, separators=(',', ':'), cls=json_encoder).encode('utf-8')
+
+    if len(payload) < compress_min_size:
+        headers = None
+    else:
+        # Raw DEFLATE, flagged with the 'zip' header like JWE (RFC 7516) does
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        payload = compressor.compress(payload) + compressor.flush()
+        headers = {'zip': 'DEF'}
+
+    # The PyJWS base class signs the payload bytes as they are
+    return jwt.PyJWS.encode(jwt.encode.__self__, payload, secret, algorithm, headers=headers,
+                            json_encoder=json_encoder).decode('utf-8')
+
+
+def _inflate(payload: bytes) -> bytes:
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(payload, _MAX_INFLATED_SIZE)
+    except zlib.error:
+        raise JWTDecodeError("Invalid compressed payload")
+    if decompressor.unconsumed_tail:
+        raise JWTDecodeError("Compressed payload is too large")
+    return data
+
+
+def _decode_compressed_jwt(jwt, encoded_token: str, secret: str, algorithm: str, verify_signature: bool) -> Dict:
+    """
+    Decodes a JWT whose payload may be DEFLATE compressed, validating the time claims
+    like PyJWT does for regular tokens.
+    """
+    if jwt.get_unverified_header(encoded_token).get('zip') != 'DEF':
+        return jwt.decode(encoded_token, secret, algorithms=[algorithm],
+                          options={'verify_signature': verify_signature})
+
+    payload = jwt.PyJWS.decode(jwt.decode.__self__, encoded_token, secret, algorithms=[algorithm],
+                               options={'verify_signature': verify_signature})
+    try:
+        data = json.loads(_inflate(payload).decode('utf-8'))
+    except ValueError:
+        raise JWTDecodeError("Invalid payload string")
+    if not isinstance(data, dict):
+        raise JWTDecodeError("Invalid payload string: must be a json object")
+
+    now = timegm(datetime.datetime.utcnow().utctimetuple())
+    try:
+        if 'iat' in data:
+            int(data['iat'])
+        if 'nbf' in data and int(data['nbf']) > now:
+            raise jwt.ImmatureSignatureError('The token is not yet valid (nbf)')
+        if 'exp' in data and int(data['exp']) < now:
+            raise jwt.ExpiredSignatureError('Signature has expired')
+    except (TypeError, ValueError):
+        raise JWTDecodeError("Invalid time claim")
+
+    return data
+
+
+def encode_access_token_sync(identity: str, secret: str, algorithm: str, expires_delta: datetime.timedelta,
+                             fresh: Union[datetime.timedelta, bool],
+                             user_claims: dict, identity_claim_key: str, user_claims_key: str,
+                             json_encoder: Callable[..., str] = None, scopes: Union[List[str], int] = None,
+                             scopes_claim_key: str = 'scopes', tenant: str = None,
+                             tenant_claim_key: str = 'iss', claim_aliases: Dict[str, str] = None,
+                             compress_min_size: int = None) -> str:
     """
     Creates a new encoded (utf-8) access token.
     :param identity: Identifier for who this token is for (ex, username). This
                      data must be json serializable
-    :param secret: Secret key to encode the JWT with
+    :param secret: Secret key to encode the JWT with (the private key for
+                   asymmetric algorithms such as RS256 or EdDSA)
     :param algorithm: Which algorithm to encode this JWT with
     :param expires_delta: How far in the future this token should expire
                           (set to False to disable expiration)
@@ -50,6 +141,15 @@ async def encode_access_token(identity: str, secret: str, algorithm: str, expire
     :param identity_claim_key: Which key should be used to store the identity
     :param user_claims_key: Which key should be used to store the user claims
     :param json_encoder: json encoder
+    :param scopes: Scopes granted to this token, either a list of scope names or
+                   a bitmask compiled by :func:`~sanic_jwt_extended.scopes.compile_scopes`
+    :param scopes_claim_key: Which key should be used to store the scopes
+    :param tenant: Tenant this token was signed for, if tenants have their own keys
+    :param tenant_claim_key: Which key should be used to store the tenant
+    :param claim_aliases: Short names to store claims under in the token, by claim
+                          name (ex: ``{'identity': 'sub'}``)
+    :param compress_min_size: Payloads of at least this many bytes are DEFLATE
+                              compressed. None disables compression
     :return: Encoded access token
     """
     if isinstance(fresh, datetime.timedelta):
@@ -66,18 +166,27 @@ async def encode_access_token(identity: str, secret: str, algorithm: str, expire
     if user_claims:
         token_data[user_claims_key] = user_claims
 
+    if scopes is not None:
+        token_data[scopes_claim_key] = scopes
+
+    if tenant is not None:
+        token_data[tenant_claim_key] = tenant
+
     return _encode_jwt(token_data, expires_delta, secret, algorithm,
-                       json_encoder=json_encoder)
+                       json_encoder=json_encoder, claim_aliases=claim_aliases,
+                       compress_min_size=compress_min_size)
 
 
-async def encode_refresh_token(identity, secret, algorithm, expires_delta, user_claims,
-                               identity_claim_key, user_claims_key,
-                               json_encoder=None):
+def encode_refresh_token_sync(identity, secret, algorithm, expires_delta, user_claims,
+                              identity_claim_key, user_claims_key,
+                              json_encoder=None, tenant=None, tenant_claim_key='iss',
+                              claim_aliases=None, compress_min_size=None):
     """
     Creates a new encoded (utf-8) refresh token.
 
     :param identity: Some identifier used to identify the owner of this token
-    :param secret: Secret key to encode the JWT with
+    :param secret: Secret key to encode the JWT with (the private key for
+                   asymmetric algorithms such as RS256 or EdDSA)
     :param algorithm: Which algorithm to use for the toek
     :param expires_delta: How far in the future this token should expire
                           (set to False to disable expiration)
@@ -87,6 +196,12 @@ async def encode_refresh_token(identity, secret, algorithm, expires_delta, user_
     :param identity_claim_key: Which key should be used to store the identity
     :param user_claims_key: Which key should be used to store the user claims
     :param json_encoder: json encoder
+    :param tenant: Tenant this token was signed for, if tenants have their own keys
+    :param tenant_claim_key: Which key should be used to store the tenant
+    :param claim_aliases: Short names to store claims under in the token, by claim
+                          name (ex: ``{'identity': 'sub'}``)
+    :param compress_min_size: Payloads of at least this many bytes are DEFLATE
+                              compressed. None disables compression
     :return: Encoded refresh token
     """
     token_data = {
@@ -98,24 +213,68 @@ async def encode_refresh_token(identity, secret, algorithm, expires_delta, user_
     if user_claims:
         token_data[user_claims_key] = user_claims
 
+    if tenant is not None:
+        token_data[tenant_claim_key] = tenant
+
     return _encode_jwt(token_data, expires_delta, secret, algorithm,
-                       json_encoder=json_encoder)
+                       json_encoder=json_encoder, claim_aliases=claim_aliases,
+                       compress_min_size=compress_min_size)
 
 
-async def decode_jwt(encoded_token: str, secret: str, algorithm: str, identity_claim_key: str,
-                     user_claims_key: str) -> Dict:
+def peek_claims(encoded_token: str, claim_aliases: Dict[str, str] = None) -> Dict:
+    """
+    Reads the claims of an encoded JWT without verifying it. Only use this on tokens
+    that are trusted already, such as a token this process just encoded.
+
+    :param encoded_token: The encoded JWT string
+    :param claim_aliases: Short names the claims are stored under, by claim name
+    :return: Dictionary containing contents of the JWT
+    """
+    header, payload = encoded_token.split('.')[:2]
+    data = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+    if json.loads(base64.urlsafe_b64decode(header + '=' * (-len(header) % 4)).decode('utf-8')).get('zip') == 'DEF':
+        data = _inflate(data)
+    return _expand_claims(json.loads(data.decode('utf-8')), claim_aliases)
+
+
+def _expand_claims(data: dict, claim_aliases: Dict[str, str] = None) -> Dict:
+    """
+    Rename claims stored under their alias back to their claim name
+    """
+    if claim_aliases:
+        for name, alias in claim_aliases.items():
+            if alias in data:
+                data[name] = data.pop(alias)
+    return data
+
+
+def decode_jwt_sync(encoded_token: str, secret: str, algorithm: str, identity_claim_key: str,
+                    user_claims_key: str, verify_signature: bool = True, claim_aliases: Dict[str, str] = None,
+                    decompress: bool = False) -> Dict:
     """
     Decodes an encoded JWT
 
     :param encoded_token: The encoded JWT string to decode
-    :param secret: Secret key used to encode the JWT
+    :param secret: Secret key used to encode the JWT (the public key for
+                   asymmetric algorithms such as RS256 or EdDSA)
     :param algorithm: Algorithm used to encode the JWT
     :param identity_claim_key: expected key that contains the identity
     :param user_claims_key: expected key that contains the user claims
+    :param verify_signature: Set to False to skip signature verification of a token
+                             that is already known to be valid
+    :param claim_aliases: Short names the claims may be stored under, by claim name.
+                          Aliased claims are returned under their claim name
+    :param decompress: Accept tokens with a DEFLATE compressed payload
     :return: Dictionary containing contents of the JWT
     """
     # This call verifies the ext, iat, and nbf claims
-    data: dict = jwt.decode(encoded_token, secret, algorithms=[algorithm])
+    jwt = _import_jwt(algorithm)
+    if decompress:
+        data: dict = _decode_compressed_jwt(jwt, encoded_token, secret, algorithm, verify_signature)
+    else:
+        data: dict = jwt.decode(encoded_token, secret, algorithms=[algorithm],
+                                options={'verify_signature': verify_signature})
+    _expand_claims(data, claim_aliases)
 
     # Make sure that any custom claims we expect in the token are present
     if 'jti' not in data:
@@ -133,16 +292,57 @@ async def decode_jwt(encoded_token: str, secret: str, algorithm: str, identity_c
     return data
 
 
+async def encode_access_token(identity: str, secret: str, algorithm: str, expires_delta: datetime.timedelta,
+                              fresh: Union[datetime.timedelta, bool],
+                              user_claims: dict, identity_claim_key: str, user_claims_key: str,
+                              json_encoder: Callable[..., str] = None, scopes: Union[List[str], int] = None,
+                              scopes_claim_key: str = 'scopes', tenant: str = None,
+                              tenant_claim_key: str = 'iss', claim_aliases: Dict[str, str] = None,
+                              compress_min_size: int = None) -> str:
+    """
+    Coroutine version of :func:`encode_access_token_sync`.
+    """
+    return encode_access_token_sync(identity, secret, algorithm, expires_delta, fresh, user_claims,
+                                    identity_claim_key, user_claims_key, json_encoder, scopes,
+                                    scopes_claim_key, tenant, tenant_claim_key, claim_aliases,
+                                    compress_min_size)
+
+
+async def encode_refresh_token(identity, secret, algorithm, expires_delta, user_claims,
+                               identity_claim_key, user_claims_key,
+                               json_encoder=None, tenant=None, tenant_claim_key='iss',
+                               claim_aliases=None, compress_min_size=None):
+    """
+    Coroutine version of :func:`encode_refresh_token_sync`.
+    """
+    return encode_refresh_token_sync(identity, secret, algorithm, expires_delta, user_claims,
+                                     identity_claim_key, user_claims_key, json_encoder, tenant, tenant_claim_key,
+                                     claim_aliases, compress_min_size)
+
+
+async def decode_jwt(encoded_token: str, secret: str, algorithm: str, identity_claim_key: str,
+                     user_claims_key: str, verify_signature: bool = True, claim_aliases: Dict[str, str] = None,
+                     decompress: bool = False) -> Dict:
+    """
+    Coroutine version of :func:`decode_jwt_sync`.
+    """
+    return decode_jwt_sync(encoded_token, secret, algorithm, identity_claim_key, user_claims_key, verify_signature,
+                           claim_aliases, decompress)
+
+
 class Token:
     """
     Token object that contains decoded token data and passed with kwargs to endpoint function
     """
     data: dict
-    app: Sanic
+    app: 'Sanic'
+    current_user: object
 
-    def __init__(self, app: Sanic, token: dict):
+    def __init__(self, app: 'Sanic', token: dict):
         self.app = app
         self.data = token
+        # Filled by the decorators when a user loader is registered
+        self.current_user = None
 
     @property
     def raw_jwt(self) -> dict:
@@ -171,3 +371,20 @@ class Token:
         :return: jti data
         """
         return self.data.get("jti", None)
+
+    @property
+    def jwt_tenant(self) -> Union[str, None]:
+        """
+        :return: tenant the token was signed for (or None if tenants do not have their own keys)
+        """
+        return self.data.get(self.app.config.JWT_TENANT_CLAIM, None)
+
+    @property
+    def jwt_scopes(self) -> List[str]:
+        """
+        :return: scope names granted to this token
+        """
+        scopes = self.data.get(self.app.config.JWT_SCOPES_CLAIM, [])
+        if isinstance(scopes, int):
+            return expand_scopes(scopes, self.app.config.JWT_SCOPES)
+        return scopes
@@ -1,4 +1,10 @@
-async def create_access_token(app, identity, user_claims=None, fresh=False, expires_delta=None):
+import uuid
+
+from sanic_jwt_extended.gateway import attest_claims
+
+
+async def create_access_token(app, identity, user_claims=None, fresh=False, expires_delta=None, scopes=None,
+                              tenant=None):
     """
     Create a new access token.
 
@@ -6,7 +12,9 @@ async def create_access_token(app, identity, user_claims=None, fresh=False, expi
     :param identity: The identity of this token, which can be any data that is
                      json serializable. It can also be a python object
     :param user_claims: User made claims that will be added to this token. it
-                        should be dictionary.
+                        should be dictionary. If this is None, the claims returned
+                        by the :meth:`~sanic_jwt_extended.JWTManager.user_claims_loader`
+                        callback are used, if one is registered.
     :param fresh: If this token should be marked as fresh, and can thus access
                   :func:`~sanic_jwt_extended.fresh_jwt_required` endpoints.
                   Defaults to `False`. This value can also be a
@@ -16,12 +24,20 @@ async def create_access_token(app, identity, user_claims=None, fresh=False, expi
                           last before it expires. Set to False to disable
                           expiration. If this is None, it will use the
                           'JWT_ACCESS_TOKEN_EXPIRES` config value
-    :return: An encoded access token
+    :param scopes: Scope names granted to this token, checked by
+                   :func:`~sanic_jwt_extended.jwt_scopes_required`. Stored as a
+                   bitmask if `JWT_COMPACT_SCOPES` is enabled. A bitmask compiled
+                   by :func:`~sanic_jwt_extended.scopes.compile_scopes` is stored as is
+    :param tenant: Tenant to sign this token for, with the keys loaded by the
+                   :meth:`~sanic_jwt_extended.JWTManager.tenant_key_loader` callback.
+                   If this is None, the keys of the application are used
+    :return: An encoded access token, or an opaque reference to it if
+             `JWT_REFERENCE_TOKENS` is enabled
     """
-    return await app.jwt._create_access_token(app, identity, user_claims, fresh, expires_delta)
+    return await app.jwt._create_access_token(app, identity, user_claims, fresh, expires_delta, scopes, tenant)
 
 
-async def create_refresh_token(app, identity, user_claims=None, expires_delta=None):
+async def create_refresh_token(app, identity, user_claims=None, expires_delta=None, tenant=None):
     """
     Create a new refresh token.
 
@@ -34,6 +50,64 @@ async def create_refresh_token(app, identity, user_claims=None, expires_delta=No
                           last before it expires. Set to False to disable
                           expiration. If this is None, it will use the
                           'JWT_REFRESH_TOKEN_EXPIRES` config value
+    :param tenant: Tenant to sign this token for, with the keys loaded by the
+                   :meth:`~sanic_jwt_extended.JWTManager.tenant_key_loader` callback.
+                   If this is None, the keys of the application are used
     :return: An encoded access token
     """
-    return await app.jwt._create_refresh_token(app, identity, user_claims, expires_delta)
+    return await app.jwt._create_refresh_token(app, identity, user_claims, expires_delta, tenant)
+
+
+async def revoke_token(app, jti, expires=None):
+    """
+    Revoke a token in every worker. Requires `JWT_SHARED_STATE` to be enabled.
+
+    :param app: A Sanic application from request object
+    :param jti: The jti of the token to revoke, see :py:attr:`~sanic_jwt_extended.tokens.Token.jti`
+    :param expires: The exp claim of the token. The revocation is forgotten once the
+                    token has expired. If this is None, it is kept forever
+    """
+    if app.jwt.shared_state is None:
+        raise RuntimeError("Revoking tokens requires JWT_SHARED_STATE to be enabled")
+    app.jwt.shared_state.revoke(jti, expires)
+
+
+async def revoke_reference_token(app, reference):
+    """
+    Revoke an opaque reference token created while `JWT_REFERENCE_TOKENS` is enabled.
+    The reference is removed from the store and from the cache of this worker, other
+    workers reject it once their cached entry expires (`JWT_REFERENCE_TOKEN_CACHE_TTL`).
+
+    :param app: A Sanic application from request object
+    :param reference: The opaque reference token to revoke
+    """
+    await app.jwt.reference_token_store.delete(reference)
+    app.jwt.reference_token_cache.invalidate(reference)
+
+
+async def create_gateway_headers(app, token, request_id=None):
+    """
+    Create the headers forwarding the verified claims of a token to internal services,
+    for an edge service acting as trusted gateway. Internal services sharing the same
+    `JWT_GATEWAY_ATTESTATION_KEY` use the forwarded claims instead of verifying the token
+    again, as long as the attestation is younger than `JWT_GATEWAY_ATTESTATION_TTL`
+    and comes with the same request ID. Keep forwarding the token itself, so services
+    can fall back to verifying it.
+
+    :param app: A Sanic application from request object
+    :param token: The verified :class:`~sanic_jwt_extended.tokens.Token` passed to the endpoint
+    :param request_id: ID of the forwarded request. If this is None, a random one is generated
+    :return: Dictionary of the claims, attestation and request ID headers
+    """
+    config = app.config
+    if config.JWT_GATEWAY_ATTESTATION_KEY is None:
+        raise RuntimeError("Forwarding claims requires JWT_GATEWAY_ATTESTATION_KEY to be set")
+
+    if request_id is None:
+        request_id = uuid.uuid4().hex
+    encoded_claims, attestation = attest_claims(config.JWT_GATEWAY_ATTESTATION_KEY, token.data, request_id)
+    return {
+        config.JWT_GATEWAY_CLAIMS_HEADER: encoded_claims,
+        config.JWT_GATEWAY_ATTESTATION_HEADER: attestation,
+        config.JWT_GATEWAY_REQUEST_ID_HEADER: request_id,
+    }
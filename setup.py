@@ -29,6 +29,9 @@ setup(name='Sanic-JWT-Extended',
           'Sanic',
           'PyJWT',
       ],
+      extras_require={
+          'asymmetric_crypto': ['cryptography>=2.6'],
+      },
       classifiers=[
         'Development Status :: 3 - Alpha',
         'Environment :: Web Environment',
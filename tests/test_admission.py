@@ -0,0 +1,71 @@
+import asyncio
+import time
+import unittest
+
+from sanic import Sanic
+
+from sanic_jwt_extended import JWTManager, create_access_token
+from sanic_jwt_extended.admission import AdmissionController
+from sanic_jwt_extended.decorators import _get_jwt_data_admitted
+from sanic_jwt_extended.exceptions import ServiceOverloadedError
+
+
+class AdmissionControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_blocking_calls_are_queued_and_shed(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=1)
+
+        async def run():
+            calls = [asyncio.ensure_future(controller.run(time.sleep, 0.1)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            self.assertEqual((controller.in_flight, controller.queue_depth), (1, 1))
+            return await asyncio.gather(*calls, return_exceptions=True)
+
+        results = self.loop.run_until_complete(run())
+        self.assertEqual([type(result) for result in results], [type(None), type(None), ServiceOverloadedError])
+        self.assertEqual(controller.counters, {"admitted": 2, "queued": 1, "shed": 1})
+        self.assertEqual((controller.in_flight, controller.queue_depth), (0, 0))
+
+
+class AdmissionTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Sanic("admission_" + self._testMethodName)
+        self.app.config.JWT_SECRET_KEY = "secret"
+        self.app.config.JWT_SIGNING_CONCURRENCY = 1
+        self.app.config.JWT_VERIFICATION_CONCURRENCY = 1
+        self.app.config.JWT_VERIFICATION_QUEUE_SIZE = 1
+        JWTManager(self.app)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_concurrent_signing_is_shed(self):
+        async def run():
+            return await asyncio.gather(*(create_access_token(self.app, "user") for _ in range(3)),
+                                        return_exceptions=True)
+
+        results = self.loop.run_until_complete(run())
+        self.assertIsInstance(results[0], str)
+        self.assertIsInstance(results[1], ServiceOverloadedError)
+        self.assertIsInstance(results[2], ServiceOverloadedError)
+        self.assertEqual(self.app.jwt.signing_admission.counters["shed"], 2)
+
+    def test_concurrent_verification_is_shed(self):
+        async def run():
+            tokens = []
+            for identity in range(4):
+                tokens.append(await create_access_token(self.app, identity))
+            return await asyncio.gather(*(_get_jwt_data_admitted(self.app, token) for token in tokens),
+                                        return_exceptions=True)
+
+        results = self.loop.run_until_complete(run())
+        self.assertEqual([result["identity"] for result in results[:2]], [0, 1])
+        self.assertIsInstance(results[2], ServiceOverloadedError)
+        self.assertIsInstance(results[3], ServiceOverloadedError)
+        self.assertEqual(self.app.jwt.verification_admission.counters, {"admitted": 2, "queued": 1, "shed": 2})
@@ -0,0 +1,97 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from sanic import Sanic
+from sanic.response import json
+
+from sanic_jwt_extended import (
+    JWTManager, create_access_token, create_refresh_token, fresh_jwt_required, jwt_optional,
+    jwt_refresh_token_required, jwt_required
+)
+from sanic_jwt_extended.decorators import _get_request_jwt_data
+
+
+def create_app(name):
+    app = Sanic(name)
+    app.config.JWT_SECRET_KEY = "secret"
+    JWTManager(app)
+
+    @app.route("/login")
+    async def login(request):
+        return json({
+            "access_token": await create_access_token(app, "user", fresh=True),
+            "refresh_token": await create_refresh_token(app, "user"),
+        })
+
+    @app.route("/required")
+    @jwt_required
+    async def required(request, token):
+        return json({"identity": token.jwt_identity})
+
+    @app.route("/optional")
+    @jwt_optional
+    async def optional(request, token):
+        return json({"identity": token.jwt_identity})
+
+    @app.route("/fresh")
+    @fresh_jwt_required
+    async def fresh(request, token):
+        return json({"identity": token.jwt_identity})
+
+    @app.route("/refresh")
+    @jwt_refresh_token_required
+    async def refresh(request, token):
+        return json({"identity": token.jwt_identity})
+
+    return app
+
+
+class DecoratorsTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("decorators_" + self._testMethodName)
+        _, response = self.app.test_client.get("/login")
+        self.access_token = response.json["access_token"]
+        self.refresh_token = response.json["refresh_token"]
+
+    def get(self, uri, token=None):
+        headers = {"Authorization": "Bearer " + token} if token else {}
+        _, response = self.app.test_client.get(uri, headers=headers)
+        return response.status, response.json
+
+    def test_access_token(self):
+        for uri in ("/required", "/optional", "/fresh"):
+            self.assertEqual(self.get(uri, self.access_token), (200, {"identity": "user"}))
+        self.assertEqual(self.get("/refresh", self.access_token)[0], 422)
+
+    def test_refresh_token(self):
+        self.assertEqual(self.get("/refresh", self.refresh_token), (200, {"identity": "user"}))
+        for uri in ("/required", "/optional", "/fresh"):
+            self.assertEqual(self.get(uri, self.refresh_token)[0], 422)
+
+    def test_missing_token(self):
+        for uri in ("/required", "/fresh", "/refresh"):
+            self.assertEqual(self.get(uri)[0], 401)
+
+    def test_optional_without_token(self):
+        self.assertEqual(self.get("/optional"), (200, {"identity": None}))
+
+    def test_optional_with_malformed_header(self):
+        _, response = self.app.test_client.get("/optional", headers={"Authorization": "Token " + self.access_token})
+        self.assertEqual((response.status, response.json), (200, {"identity": None}))
+
+    def test_optional_with_invalid_token(self):
+        self.assertEqual(self.get("/optional", self.access_token[:-2])[0], 422)
+
+    def test_verifies_synchronously_without_coroutine(self):
+        request = SimpleNamespace(headers={"Authorization": "Bearer " + self.access_token})
+        self.assertEqual(_get_request_jwt_data(self.app, request)["identity"], "user")
+
+        self.app.jwt.verification_admission = self.app.jwt._create_admission_controller(1, 0)
+        awaitable = _get_request_jwt_data(self.app, request)
+        self.assertTrue(asyncio.iscoroutine(awaitable))
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(loop.run_until_complete(awaitable)["identity"], "user")
+        finally:
+            loop.close()
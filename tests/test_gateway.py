@@ -0,0 +1,101 @@
+import asyncio
+import time
+import unittest
+
+from sanic import Sanic
+from sanic.response import json
+
+from sanic_jwt_extended import JWTManager, create_access_token, jwt_refresh_token_required, jwt_required
+from sanic_jwt_extended.decorators import get_jwt_data_sync
+from sanic_jwt_extended.gateway import attest_claims, verify_attestation
+
+KEY = "attestation-key"
+
+
+class AttestationTest(unittest.TestCase):
+    claims = {"identity": "user", "type": "access", "jti": "jti", "exp": int(time.time()) + 60}
+
+    def test_valid_attestation(self):
+        encoded_claims, attestation = attest_claims(KEY, self.claims, "request-1")
+        self.assertEqual(verify_attestation(KEY, encoded_claims, attestation, "request-1", 5), self.claims)
+
+    def test_other_request_id(self):
+        encoded_claims, attestation = attest_claims(KEY, self.claims, "request-1")
+        self.assertIsNone(verify_attestation(KEY, encoded_claims, attestation, "request-2", 5))
+
+    def test_other_key(self):
+        encoded_claims, attestation = attest_claims("other-key", self.claims, "request-1")
+        self.assertIsNone(verify_attestation(KEY, encoded_claims, attestation, "request-1", 5))
+
+    def test_tampered_mac(self):
+        encoded_claims, attestation = attest_claims(KEY, self.claims, "request-1")
+        issued_at, _, mac = attestation.partition(".")
+        tampered = "{}.{}{}".format(issued_at, "A" if mac[0] != "A" else "B", mac[1:])
+        self.assertIsNone(verify_attestation(KEY, encoded_claims, tampered, "request-1", 5))
+        self.assertIsNone(verify_attestation(KEY, encoded_claims, "garbage", "request-1", 5))
+        self.assertIsNone(verify_attestation(KEY, encoded_claims, issued_at + ".é", "request-1", 5))
+
+    def test_tampered_claims(self):
+        encoded_claims, attestation = attest_claims(KEY, self.claims, "request-1")
+        other_claims, _ = attest_claims(KEY, dict(self.claims, identity="admin"), "request-1")
+        self.assertIsNone(verify_attestation(KEY, other_claims, attestation, "request-1", 5))
+
+    def test_expired_attestation(self):
+        now = time.time()
+        encoded_claims, attestation = attest_claims(KEY, self.claims, "request-1", now=now - 10)
+        self.assertIsNone(verify_attestation(KEY, encoded_claims, attestation, "request-1", 5, now=now))
+        self.assertIsNotNone(verify_attestation(KEY, encoded_claims, attestation, "request-1", 15, now=now))
+
+    def test_expired_token(self):
+        claims = dict(self.claims, exp=int(time.time()) - 1)
+        encoded_claims, attestation = attest_claims(KEY, claims, "request-1")
+        self.assertIsNone(verify_attestation(KEY, encoded_claims, attestation, "request-1", 5))
+
+
+class TrustedGatewayTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Sanic("gateway_" + self._testMethodName)
+        self.app.config.JWT_SECRET_KEY = "secret"
+        self.app.config.JWT_GATEWAY_ATTESTATION_KEY = KEY
+        JWTManager(self.app)
+
+        @self.app.route("/protected")
+        @jwt_required
+        async def protected(request, token):
+            return json({"identity": token.jwt_identity})
+
+        @self.app.route("/refresh")
+        @jwt_refresh_token_required
+        async def refresh(request, token):
+            return json({"identity": token.jwt_identity})
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.access_token = loop.run_until_complete(create_access_token(self.app, "user"))
+        finally:
+            loop.close()
+        self.claims = get_jwt_data_sync(self.app, self.access_token)
+
+    def attested_headers(self, claims=None, request_id="request-1"):
+        encoded_claims, attestation = attest_claims(KEY, claims or self.claims, "request-1")
+        return {"X-JWT-Claims": encoded_claims, "X-JWT-Attestation": attestation, "X-Request-ID": request_id}
+
+    def get(self, uri, headers):
+        _, response = self.app.test_client.get(uri, headers=headers)
+        return response.status, response.json
+
+    def test_attested_claims_are_used(self):
+        self.assertEqual(self.get("/protected", self.attested_headers()), (200, {"identity": "user"}))
+
+    def test_invalid_attestation_is_not_used(self):
+        for headers in (self.attested_headers(request_id="request-2"),
+                        self.attested_headers(dict(self.claims, exp=int(time.time()) - 1))):
+            self.assertEqual(self.get("/protected", headers)[0], 401)
+
+    def test_falls_back_to_token(self):
+        headers = self.attested_headers(request_id="request-2")
+        headers["Authorization"] = "Bearer " + self.access_token
+        self.assertEqual(self.get("/protected", headers), (200, {"identity": "user"}))
+
+    def test_attested_access_token_on_refresh_endpoint(self):
+        self.assertEqual(self.get("/refresh", self.attested_headers())[0], 422)
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from sanic import Sanic
+
+from sanic_jwt_extended import JWTManager, create_access_token
+from sanic_jwt_extended.audit import AuditSink
+from sanic_jwt_extended.decorators import get_jwt_data_sync, get_token_in_request
+from sanic_jwt_extended.exceptions import NoAuthorizationError
+
+
+class MemorySink(AuditSink):
+    def __init__(self):
+        self.events = []
+
+    async def write(self, events):
+        self.events.extend(events)
+
+
+class MultipleAppsTest(unittest.TestCase):
+    def setUp(self):
+        self.first = Sanic("first_" + self._testMethodName)
+        self.first.config.JWT_SECRET_KEY = "secret"
+        self.first.config.JWT_SCOPES = ["read", "write"]
+        self.first.config.JWT_COMPACT_SCOPES = True
+        self.first.config.JWT_COMPACT_CLAIMS = True
+        self.first.config.JWT_AUDIT_SINK = MemorySink()
+
+        self.second = Sanic("second_" + self._testMethodName)
+        self.second.config.JWT_SECRET_KEY = "secret"
+        self.second.config.JWT_SCOPES = ["write", "read"]
+        self.second.config.JWT_COMPACT_SCOPES = True
+        self.second.config.JWT_TOKEN_LOCATION = ["query_string"]
+        self.second.config.JWT_AUDIT_SINK = MemorySink()
+
+        self.jwt = JWTManager(self.first)
+        self.jwt.init_app(self.second)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def create_access_token(self, app, **kwargs) -> str:
+        return self.loop.run_until_complete(create_access_token(app, "user", **kwargs))
+
+    def test_token_locations_are_per_app(self):
+        request = SimpleNamespace(headers={"Authorization": "Bearer header-token"}, args={"jwt": "query-token"})
+        self.assertEqual(get_token_in_request(self.first, request), "header-token")
+        self.assertEqual(get_token_in_request(self.second, request), "query-token")
+
+        request = SimpleNamespace(headers={"Authorization": "Bearer header-token"}, args={})
+        self.assertEqual(get_token_in_request(self.first, request), "header-token")
+        with self.assertRaises(NoAuthorizationError):
+            get_token_in_request(self.second, request)
+
+    def test_scope_masks_are_per_app(self):
+        first_token = self.create_access_token(self.first, scopes=["read"])
+        second_token = self.create_access_token(self.second, scopes=["read"])
+        self.assertEqual(get_jwt_data_sync(self.first, first_token)["scopes"], 0b01)
+        self.assertEqual(get_jwt_data_sync(self.second, second_token)["scopes"], 0b10)
+
+    def test_claim_aliases_are_per_app(self):
+        first_token = self.create_access_token(self.first, user_claims={"role": "admin"})
+        second_token = self.create_access_token(self.second, user_claims={"role": "admin"})
+        self.assertLess(len(first_token), len(second_token))
+
+        for app, token in ((self.first, first_token), (self.second, second_token)):
+            data = get_jwt_data_sync(app, token)
+            self.assertEqual((data["identity"], data["user_claims"]), ("user", {"role": "admin"}))
+
+    def test_state_is_per_app(self):
+        self.assertIsNot(self.first.jwt, self.second.jwt)
+        for name in ("audit", "timer_wheel", "consumed_jtis", "reference_token_cache", "user_cache"):
+            self.assertIsNot(getattr(self.first.jwt, name), getattr(self.second.jwt, name))
+
+        self.create_access_token(self.second)
+        self.loop.run_until_complete(self.first.jwt.audit.close())
+        self.loop.run_until_complete(self.second.jwt.audit.close())
+        self.assertEqual(self.first.config.JWT_AUDIT_SINK.events, [])
+        self.assertEqual([event["event"] for event in self.second.config.JWT_AUDIT_SINK.events], ["issued"])
+
+    def test_callbacks_are_shared(self):
+        @self.jwt.user_claims_loader
+        async def load_user_claims(identity):
+            return {"role": "admin"}
+
+        for app in (self.first, self.second):
+            self.assertEqual(get_jwt_data_sync(app, self.create_access_token(app))["user_claims"], {"role": "admin"})
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from sanic import Sanic
+
+from sanic_jwt_extended import JWTManager, create_access_token, revoke_token
+from sanic_jwt_extended.decorators import get_jwt_data
+from sanic_jwt_extended.exceptions import JWTDecodeError, RevokedTokenError
+from sanic_jwt_extended.utils import revoke_reference_token
+
+
+class ReferenceTokenTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Sanic("reference_" + self._testMethodName)
+        self.app.config.JWT_SECRET_KEY = "secret"
+        self.app.config.JWT_REFERENCE_TOKENS = True
+        self.app.config.JWT_SHARED_STATE = True
+        self.app.config.JWT_SHARED_STATE_PATH = os.path.join(self.directory.name, "state")
+        JWTManager(self.app)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        # The shared state unmaps itself at exit
+        self.directory.cleanup()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_reference_is_resolved(self):
+        reference = self.run_async(create_access_token(self.app, "user"))
+        self.assertNotIn(".", reference)
+        self.assertEqual(self.run_async(get_jwt_data(self.app, reference))["identity"], "user")
+
+    def test_revoked_reference(self):
+        reference = self.run_async(create_access_token(self.app, "user"))
+        self.run_async(get_jwt_data(self.app, reference))
+        self.run_async(revoke_reference_token(self.app, reference))
+        with self.assertRaises(JWTDecodeError):
+            self.run_async(get_jwt_data(self.app, reference))
+
+    def test_revoked_token_of_cached_reference(self):
+        reference = self.run_async(create_access_token(self.app, "user"))
+        jti = self.run_async(get_jwt_data(self.app, reference))["jti"]
+        self.assertIsNotNone(self.app.jwt.reference_token_cache.get(reference))
+
+        self.run_async(revoke_token(self.app, jti))
+        with self.assertRaises(RevokedTokenError):
+            self.run_async(get_jwt_data(self.app, reference))
@@ -0,0 +1,57 @@
+import unittest
+
+from sanic import Sanic
+from sanic.response import json
+
+from sanic_jwt_extended import JWTManager, create_access_token, jwt_required, jwt_scopes_required
+from sanic_jwt_extended.scopes import compile_scopes, expand_scopes
+
+
+def create_app(name, compact_scopes):
+    app = Sanic(name)
+    app.config.JWT_SECRET_KEY = "secret"
+    app.config.JWT_SCOPES = ["read", "write"]
+    app.config.JWT_COMPACT_SCOPES = compact_scopes
+    JWTManager(app)
+
+    @app.route("/login")
+    async def login(request):
+        return json({"access_token": await create_access_token(app, "user", scopes=["read"])})
+
+    @app.route("/read")
+    @jwt_required
+    @jwt_scopes_required("read")
+    async def read(request, token):
+        return json({"identity": token.jwt_identity})
+
+    @app.route("/write")
+    @jwt_required
+    @jwt_scopes_required("read", "write")
+    async def write(request, token):
+        return json({"identity": token.jwt_identity})
+
+    @app.route("/admin")
+    @jwt_required
+    @jwt_scopes_required("admin")
+    async def admin(request, token):
+        return json({"identity": token.jwt_identity})
+
+    return app
+
+
+class ScopesTest(unittest.TestCase):
+    def test_compile_scopes(self):
+        self.assertEqual(compile_scopes(["write"], ["read", "write"]), 0b10)
+        self.assertEqual(expand_scopes(0b11, ["read", "write"]), ["read", "write"])
+        with self.assertRaises(ValueError):
+            compile_scopes(["admin"], ["read", "write"])
+
+    def test_required_scopes(self):
+        for compact_scopes in (False, True):
+            app = create_app("scopes_{}_{}".format(self._testMethodName, compact_scopes), compact_scopes)
+            _, response = app.test_client.get("/login")
+            headers = {"Authorization": "Bearer " + response.json["access_token"]}
+
+            statuses = [app.test_client.get(uri, headers=headers)[1].status for uri in ("/read", "/write", "/admin")]
+            # Requiring a scope missing from JWT_SCOPES is a server error for both token formats
+            self.assertEqual(statuses, [200, 403, 500])
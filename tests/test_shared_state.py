@@ -0,0 +1,55 @@
+import os
+import tempfile
+import time
+import unittest
+
+from sanic_jwt_extended.shared_state import SharedTokenState
+
+
+class SharedTokenStateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_creates_private_file(self):
+        state = SharedTokenState(self.path, slots=64)
+        self.assertTrue(state.created)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        state.close()
+
+    def test_refuses_file_readable_by_others(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\0" * 64)
+        os.chmod(self.path, 0o644)
+        with self.assertRaises(RuntimeError):
+            SharedTokenState(self.path, slots=64)
+
+    def test_refuses_symbolic_link(self):
+        target = os.path.join(self.directory.name, "target")
+        os.symlink(target, self.path)
+        with self.assertRaises(OSError):
+            SharedTokenState(self.path, slots=64)
+        self.assertFalse(os.path.exists(target))
+
+    def test_verified_entries_are_keyed(self):
+        state = SharedTokenState(self.path, slots=64)
+        state.mark_verified("token", int(time.time()) + 60, "key")
+        self.assertTrue(state.is_verified("token", "key"))
+        self.assertFalse(state.is_verified("token", "rotated-key"))
+        self.assertFalse(state.is_verified("other-token", "key"))
+
+        # An entry written without the key does not count as verified
+        state._add(state.VERIFIED, "planted-token", state.NEVER_EXPIRES)
+        self.assertFalse(state.is_verified("planted-token", "key"))
+        state.close()
+
+    def test_revoked_entries_expire(self):
+        state = SharedTokenState(self.path, slots=64)
+        state.revoke("live", int(time.time()) + 60)
+        state.revoke("expired", int(time.time()) - 1)
+        self.assertTrue(state.is_revoked("live"))
+        self.assertFalse(state.is_revoked("expired"))
+        state.close()
@@ -0,0 +1,55 @@
+import time
+import unittest
+
+from sanic import Sanic
+from sanic.response import json
+
+from sanic_jwt_extended import JWTManager, create_access_token, jwt_required, jwt_single_use
+from sanic_jwt_extended.single_use import ConsumedJtiSet
+
+
+class ConsumedJtiSetTest(unittest.TestCase):
+    def test_second_use(self):
+        consumed = ConsumedJtiSet(bucket_seconds=60)
+        expires = int(time.time()) + 60
+        self.assertTrue(consumed.consume("jti", expires))
+        self.assertFalse(consumed.consume("jti", expires))
+        self.assertTrue(consumed.consume("other-jti", expires))
+        self.assertEqual(len(consumed), 2)
+
+    def test_expired_buckets_are_dropped(self):
+        consumed = ConsumedJtiSet(bucket_seconds=10)
+        now = time.time()
+        consumed.consume("expired", now - 20)
+        consumed.consume("expiring", now - 20 + 5)
+        self.assertEqual(len(consumed), 1)
+
+        consumed.consume("live", now + 60)
+        self.assertEqual(len(consumed._buckets), 1)
+        self.assertEqual(len(consumed), 1)
+
+
+class SingleUseTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Sanic("single_use_" + self._testMethodName)
+        self.app.config.JWT_SECRET_KEY = "secret"
+        JWTManager(self.app)
+
+        @self.app.route("/login")
+        async def login(request):
+            return json({"access_token": await create_access_token(self.app, "user")})
+
+        @self.app.route("/reset")
+        @jwt_required
+        @jwt_single_use
+        async def reset(request, token):
+            return json({"identity": token.jwt_identity})
+
+    def test_token_is_rejected_on_second_use(self):
+        _, response = self.app.test_client.get("/login")
+        headers = {"Authorization": "Bearer " + response.json["access_token"]}
+
+        _, response = self.app.test_client.get("/reset", headers=headers)
+        self.assertEqual((response.status, response.json), (200, {"identity": "user"}))
+        _, response = self.app.test_client.get("/reset", headers=headers)
+        self.assertEqual((response.status, response.json), (422, {"msg": "Token has already been used"}))
@@ -0,0 +1,97 @@
+import datetime
+import unittest
+
+from sanic import Sanic
+from sanic.response import json
+
+from sanic_jwt_extended import JWTManager, create_access_token, jwt_required, jwt_scopes_required
+
+
+def create_app(name, compact_scopes):
+    app = Sanic(name)
+    app.config.JWT_SECRET_KEY = "secret"
+    app.config.JWT_SLIDING_SESSION = True
+    app.config.JWT_SCOPES = ["read", "write", "admin"]
+    app.config.JWT_COMPACT_SCOPES = compact_scopes
+    JWTManager(app)
+
+    @app.route("/protected")
+    @jwt_required
+    @jwt_scopes_required("read", "write")
+    async def protected(request, token):
+        return json({"identity": token.jwt_identity, "scopes": token.jwt_scopes})
+
+    return app
+
+
+class SlidingSessionScopesTest(unittest.TestCase):
+    def check_reissued_token_keeps_scopes(self, compact_scopes):
+        app = create_app("sliding_scopes_{}".format(compact_scopes), compact_scopes)
+
+        @app.route("/login")
+        async def login(request):
+            # Inside JWT_SLIDING_SESSION_WINDOW, so the first request re-issues it
+            access_token = await create_access_token(app, "user", scopes=["read", "write"],
+                                                     expires_delta=datetime.timedelta(seconds=30))
+            return json({"access_token": access_token})
+
+        _, response = app.test_client.get("/login")
+        access_token = response.json["access_token"]
+
+        _, response = app.test_client.get("/protected", headers={"Authorization": "Bearer " + access_token})
+        self.assertEqual(response.status, 200)
+        reissued = response.headers.get("X-Access-Token")
+        self.assertTrue(reissued)
+
+        _, response = app.test_client.get("/protected", headers={"Authorization": "Bearer " + reissued})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(sorted(response.json["scopes"]), ["read", "write"])
+
+    def test_reissued_token_keeps_scopes(self):
+        self.check_reissued_token_keeps_scopes(False)
+
+    def test_reissued_token_keeps_compact_scopes(self):
+        self.check_reissued_token_keeps_scopes(True)
+
+
+class FailedReissueTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Sanic("failed_reissue")
+        self.app.config.JWT_SECRET_KEY = "secret"
+        self.app.config.JWT_SLIDING_SESSION = True
+        JWTManager(self.app)
+        self.calls = 0
+
+        @self.app.route("/login")
+        async def login(request):
+            access_token = await create_access_token(self.app, "user", expires_delta=datetime.timedelta(seconds=30))
+            return json({"access_token": access_token})
+
+        @self.app.route("/protected")
+        @jwt_required
+        async def protected(request, token):
+            self.calls += 1
+            return json({"identity": token.jwt_identity})
+
+    def test_failed_reissue_keeps_response_and_is_retried(self):
+        _, response = self.app.test_client.get("/login")
+        headers = {"Authorization": "Bearer " + response.json["access_token"]}
+
+        original = self.app.jwt._create_access_token
+
+        async def fail(*args, **kwargs):
+            raise RuntimeError("store unavailable")
+
+        self.app.jwt._create_access_token = fail
+        _, response = self.app.test_client.get("/protected", headers=headers)
+        self.assertEqual((response.status, response.json), (200, {"identity": "user"}))
+        self.assertNotIn("X-Access-Token", response.headers)
+        self.assertEqual(self.calls, 1)
+
+        self.app.jwt._create_access_token = original
+        _, response = self.app.test_client.get("/protected", headers=headers)
+        self.assertEqual(response.status, 200)
+        self.assertIn("X-Access-Token", response.headers)
+
+        _, response = self.app.test_client.get("/protected", headers=headers)
+        self.assertNotIn("X-Access-Token", response.headers)
@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+
+import jwt
+from sanic import Sanic
+
+from sanic_jwt_extended import JWTManager, create_access_token
+from sanic_jwt_extended.decorators import get_jwt_data
+from sanic_jwt_extended.exceptions import JWTDecodeError
+
+
+class TenantTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Sanic("tenants_" + self._testMethodName)
+        self.app.config.JWT_SECRET_KEY = "secret"
+        self.loads = []
+        jwt_manager = JWTManager(self.app)
+
+        @jwt_manager.tenant_key_loader
+        async def load_tenant_key(tenant):
+            self.loads.append(tenant)
+            return {"acme": "acme-secret"}.get(tenant)
+
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def forge(self, tenant) -> str:
+        token = self.run_async(create_access_token(self.app, "user", tenant="acme"))
+        claims = jwt.decode(token, options={"verify_signature": False})
+        claims["iss"] = tenant
+        token = jwt.encode(claims, "attacker-secret", algorithm="HS256")
+        return token.decode("utf-8") if isinstance(token, bytes) else token
+
+    def test_tenant_keys(self):
+        token = self.run_async(create_access_token(self.app, "user", tenant="acme"))
+        self.assertEqual(self.run_async(get_jwt_data(self.app, token))["iss"], "acme")
+        self.assertEqual(self.loads, ["acme"])
+
+    def test_tenant_must_be_a_string(self):
+        for tenant in (["acme"], {"name": "acme"}, 1):
+            with self.assertRaises(JWTDecodeError):
+                self.run_async(get_jwt_data(self.app, self.forge(tenant)))
+        self.assertEqual(self.loads, ["acme"])
+
+    def test_unknown_tenants_are_cached(self):
+        for _ in range(3):
+            with self.assertRaises(JWTDecodeError):
+                self.run_async(get_jwt_data(self.app, self.forge("unknown")))
+        self.assertEqual(self.loads, ["acme", "unknown"])
+
+        self.app.jwt.unknown_tenant_cache.clear()
+        with self.assertRaises(JWTDecodeError):
+            self.run_async(get_jwt_data(self.app, self.forge("unknown")))
+        self.assertEqual(self.loads, ["acme", "unknown", "unknown"])
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from sanic_jwt_extended.timer_wheel import TimerWheel
+
+
+class TimerWheelTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.wheel = TimerWheel(tick=1.0, slots=8)
+        self.fired = {}
+
+    def tearDown(self):
+        self.loop.close()
+
+    def schedule(self, delay):
+        async def schedule():
+            handle = self.wheel.schedule(delay, lambda: self.fired.setdefault(delay, self.ticks))
+            # The wheel is advanced by hand below
+            self.wheel._task.cancel()
+            return handle
+        return self.loop.run_until_complete(schedule())
+
+    def advance(self, ticks):
+        self.ticks = 0
+        for _ in range(ticks):
+            self.ticks += 1
+            self.wheel._advance()
+
+    def test_fires_after_delay(self):
+        for delay in (1, 3, 7, 8, 9, 15, 16, 17, 24):
+            self.schedule(delay)
+        self.advance(30)
+
+        self.assertEqual(self.fired, {delay: delay for delay in (1, 3, 7, 8, 9, 15, 16, 17, 24)})
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_fires_after_delay_from_moved_cursor(self):
+        self.advance(5)
+        self.schedule(8)
+        self.schedule(16)
+        self.advance(20)
+
+        self.assertEqual(self.fired, {8: 8, 16: 16})
+
+    def test_rounds_up_to_tick(self):
+        self.schedule(0)
+        self.schedule(2.5)
+        self.advance(4)
+
+        self.assertEqual(self.fired, {0: 1, 2.5: 3})
+
+    def test_cancel(self):
+        handle = self.schedule(8)
+        self.wheel.cancel(handle)
+        self.advance(10)
+
+        self.assertEqual(self.fired, {})
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_failing_callback(self):
+        def fail():
+            raise RuntimeError("callback failed")
+
+        self.loop.set_exception_handler(lambda loop, context: self.fired.setdefault("error", context["exception"]))
+        self.schedule(1)
+        self.schedule(2)
+
+        async def run():
+            self.wheel.schedule(1, fail)
+            self.wheel._task.cancel()
+            self.advance(2)
+        self.loop.run_until_complete(run())
+
+        self.assertEqual(self.fired[1], 1)
+        self.assertEqual(self.fired[2], 2)
+        self.assertIsInstance(self.fired["error"], RuntimeError)
+        self.assertEqual(len(self.wheel), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
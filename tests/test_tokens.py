@@ -0,0 +1,88 @@
+import datetime
+import json
+import time
+import unittest
+import zlib
+
+import jwt
+
+from sanic_jwt_extended.exceptions import JWTDecodeError
+from sanic_jwt_extended.tokens import _MAX_INFLATED_SIZE, decode_jwt_sync, encode_access_token_sync, peek_claims
+
+SECRET = "secret"
+ALIASES = {"identity": "sub", "user_claims": "uc", "type": "t", "fresh": "f"}
+
+
+def encode(compress_min_size=None, claim_aliases=None, expires_delta=datetime.timedelta(minutes=5)):
+    return encode_access_token_sync(
+        identity="user", secret=SECRET, algorithm="HS256", expires_delta=expires_delta, fresh=False,
+        user_claims={"role": "admin"}, identity_claim_key="identity", user_claims_key="user_claims",
+        claim_aliases=claim_aliases, compress_min_size=compress_min_size
+    )
+
+
+def decode(token, claim_aliases=None):
+    return decode_jwt_sync(token, SECRET, "HS256", "identity", "user_claims", claim_aliases=claim_aliases,
+                           decompress=True)
+
+
+def sign_compressed(payload: bytes) -> str:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    token = jwt.PyJWS().encode(compressor.compress(payload) + compressor.flush(), SECRET, "HS256",
+                               headers={"zip": "DEF"})
+    return token.decode("utf-8") if isinstance(token, bytes) else token
+
+
+def claims(**overrides) -> bytes:
+    now = int(time.time())
+    data = {"identity": "user", "type": "access", "fresh": False, "jti": "jti", "iat": now, "nbf": now,
+            "exp": now + 60}
+    data.update(overrides)
+    return json.dumps(data).encode("utf-8")
+
+
+class CompressedTokenTest(unittest.TestCase):
+    def test_round_trip(self):
+        for compress_min_size in (None, 0, 1024):
+            for claim_aliases in (None, ALIASES):
+                token = encode(compress_min_size, claim_aliases)
+                compressed = jwt.get_unverified_header(token).get("zip") == "DEF"
+                self.assertEqual(compressed, compress_min_size == 0)
+
+                for data in (decode(token, claim_aliases), peek_claims(token, claim_aliases)):
+                    self.assertEqual((data["identity"], data["user_claims"], data["type"]),
+                                     ("user", {"role": "admin"}, "access"))
+
+    def test_aliases_shorten_tokens(self):
+        self.assertLess(len(encode(0, ALIASES)), len(encode(0)))
+        self.assertLess(len(encode(None, ALIASES)), len(encode(None)))
+
+    def test_expired(self):
+        token = encode(0, expires_delta=datetime.timedelta(seconds=-1))
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            decode(token)
+
+    def test_not_yet_valid(self):
+        with self.assertRaises(jwt.ImmatureSignatureError):
+            decode(sign_compressed(claims(nbf=int(time.time()) + 60)))
+
+    def test_invalid_time_claim(self):
+        for claim in ("exp", "nbf", "iat"):
+            with self.assertRaises(JWTDecodeError):
+                decode(sign_compressed(claims(**{claim: "soon"})))
+
+    def test_inflate_cap(self):
+        self.assertEqual(decode(sign_compressed(claims()))["identity"], "user")
+        with self.assertRaisesRegex(JWTDecodeError, "too large"):
+            decode(sign_compressed(claims(padding="x" * _MAX_INFLATED_SIZE)))
+
+    def test_tampered_payload(self):
+        header, payload, signature = encode(0).split(".")
+        tampered = "{}.{}.{}".format(header, payload[:-2] + ("AA" if payload[-2:] != "AA" else "BB"), signature)
+        with self.assertRaises(jwt.InvalidSignatureError):
+            decode(tampered)
+
+        # A signed payload that is not valid DEFLATE data
+        token = jwt.PyJWS().encode(b"not deflate", SECRET, "HS256", headers={"zip": "DEF"})
+        with self.assertRaisesRegex(JWTDecodeError, "Invalid compressed payload"):
+            decode(token.decode("utf-8") if isinstance(token, bytes) else token)
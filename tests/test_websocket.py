@@ -0,0 +1,94 @@
+import asyncio
+import datetime
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from sanic import Sanic
+
+from sanic_jwt_extended import JWTManager, create_access_token, jwt_websocket_required, revoke_token
+from sanic_jwt_extended.decorators import get_jwt_data_sync
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.closed = asyncio.Event()
+        self.close_code = None
+        self.close_reason = None
+
+    async def close(self, code=1000, reason=""):
+        self.close_code = code
+        self.close_reason = reason
+        self.closed.set()
+
+
+@jwt_websocket_required
+async def handler(request, ws, token):
+    await ws.closed.wait()
+
+
+class WebSocketTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Sanic("websocket_" + self._testMethodName)
+        self.app.config.JWT_SECRET_KEY = "secret"
+        self.app.config.JWT_SHARED_STATE = True
+        self.app.config.JWT_SHARED_STATE_PATH = os.path.join(self.directory.name, "state")
+        self.app.config.JWT_WEBSOCKET_TIMER_TICK = 0.01
+        self.app.config.JWT_WEBSOCKET_REVOCATION_CHECK_INTERVAL = 0.05
+        JWTManager(self.app)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        # The shared state unmaps itself at exit
+        self.directory.cleanup()
+
+    def connect(self, access_token: str, ws: FakeWebSocket) -> asyncio.Future:
+        request = SimpleNamespace(app=self.app, headers={"Authorization": "Bearer " + access_token})
+        return asyncio.ensure_future(handler(request, ws))
+
+    def test_revoked_token_closes_connection(self):
+        ws = FakeWebSocket()
+
+        async def run():
+            access_token = await create_access_token(self.app, "user")
+            connection = self.connect(access_token, ws)
+            await asyncio.sleep(0.1)
+            self.assertFalse(ws.closed.is_set())
+
+            await revoke_token(self.app, get_jwt_data_sync(self.app, access_token)["jti"])
+            await asyncio.wait_for(connection, 1)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(ws.close_reason, "Token has been revoked")
+        self.assertEqual(len(self.app.jwt.timer_wheel), 0)
+
+    def test_expired_token_closes_connection(self):
+        ws = FakeWebSocket()
+
+        async def run():
+            access_token = await create_access_token(self.app, "user", expires_delta=datetime.timedelta(seconds=1))
+            await asyncio.wait_for(self.connect(access_token, ws), 3)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(ws.close_reason, "Token has expired")
+        self.assertEqual(len(self.app.jwt.timer_wheel), 0)
+
+    def test_invalid_token_closes_connection(self):
+        async def run(access_token):
+            ws = FakeWebSocket()
+            await asyncio.wait_for(self.connect(access_token, ws), 1)
+            return ws.close_code, ws.close_reason
+
+        access_token = self.loop.run_until_complete(
+            create_access_token(self.app, "user", expires_delta=datetime.timedelta(seconds=-1))
+        )
+        self.assertEqual(self.loop.run_until_complete(run(access_token)), (1008, "Token has expired"))
+        self.assertEqual(self.loop.run_until_complete(run("not-a-token")), (1008, "Not enough segments"))
+
+        request = SimpleNamespace(app=self.app, headers={})
+        ws = FakeWebSocket()
+        self.loop.run_until_complete(asyncio.wait_for(handler(request, ws), 1))
+        self.assertEqual((ws.close_code, ws.close_reason), (1008, "Missing Authorization Header"))